@@ -6,28 +6,113 @@ Monitors window activity, browser history, network traffic, and file system chan
 
 import os
 import sys
+import asyncio
 import time
+import queue
 import sqlite3
+import select
+import shutil
+import socket
+import struct
+import ctypes
 import threading
 import subprocess
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 import json
 
 # Required installations:
 # pip install psutil watchdog scapy
+# Optional (Linux, avoids spawning xdotool): pip install python-xlib
+# Optional (native, batched file events): pip install watchfiles
 
 import psutil
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
 try:
-    from scapy.all import sniff, IP, TCP
+    from scapy.all import AsyncSniffer, IP, TCP, conf
     SCAPY_AVAILABLE = True
 except ImportError:
     SCAPY_AVAILABLE = False
+
+# Linux captures on a raw AF_PACKET socket directly; other platforms need Scapy
+RAW_CAPTURE_AVAILABLE = sys.platform.startswith('linux') and hasattr(socket, 'AF_PACKET')
+NETWORK_AVAILABLE = RAW_CAPTURE_AVAILABLE or SCAPY_AVAILABLE
+
+if not NETWORK_AVAILABLE:
     print("Warning: Scapy not available. Network monitoring disabled.")
 
+try:
+    from watchfiles import watch, Change, DefaultFilter
+    WATCHFILES_AVAILABLE = True
+except ImportError:
+    WATCHFILES_AVAILABLE = False
+
+try:
+    from Xlib import X
+    from Xlib.display import Display
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+if sys.platform.startswith('win'):
+    from ctypes import wintypes
+    
+    # Resolve the Win32 entry points once; calling them through ctypes skips
+    # the pywin32 marshaling layer and psutil's per-call process handle
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    _kernel32 = ctypes.WinDLL('kernel32', use_last_error=True)
+    
+    _user32.GetForegroundWindow.restype = wintypes.HWND
+    _user32.GetWindowTextLengthW.argtypes = [wintypes.HWND]
+    _user32.GetWindowTextW.argtypes = [wintypes.HWND, wintypes.LPWSTR, ctypes.c_int]
+    _user32.GetWindowThreadProcessId.argtypes = [wintypes.HWND, ctypes.POINTER(wintypes.DWORD)]
+    _kernel32.OpenProcess.restype = wintypes.HANDLE
+    _kernel32.OpenProcess.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.DWORD]
+    _kernel32.QueryFullProcessImageNameW.argtypes = [
+        wintypes.HANDLE, wintypes.DWORD, wintypes.LPWSTR, ctypes.POINTER(wintypes.DWORD)
+    ]
+    _kernel32.CloseHandle.argtypes = [wintypes.HANDLE]
+    
+    PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+    
+    # Foreground-change notifications (SetWinEventHook)
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    QS_ALLINPUT = 0x04FF
+    PM_REMOVE = 0x0001
+    
+    WinEventProc = ctypes.WINFUNCTYPE(
+        None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+        wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+    )
+    _user32.SetWinEventHook.restype = wintypes.HANDLE
+    _user32.SetWinEventHook.argtypes = [
+        wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+        wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+    ]
+    _user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+    _user32.MsgWaitForMultipleObjects.argtypes = [
+        wintypes.DWORD, ctypes.c_void_p, wintypes.BOOL, wintypes.DWORD, wintypes.DWORD
+    ]
+    _user32.PeekMessageW.argtypes = [
+        ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT, wintypes.UINT
+    ]
+    _user32.TranslateMessage.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    _user32.DispatchMessageW.argtypes = [ctypes.POINTER(wintypes.MSG)]
+
+# Safari stores visit times as seconds since the Cocoa epoch (2001-01-01 UTC)
+COCOA_EPOCH = 978307200
+# Chromium stores microseconds since the Windows epoch (1601-01-01 UTC)
+CHROMIUM_EPOCH_OFFSET_US = 11644473600000000
+
 class Colors:
     """Terminal colors for better output formatting"""
     HEADER = '\033[95m'
@@ -39,15 +124,152 @@ class Colors:
     ENDC = '\033[0m'
     BOLD = '\033[1m'
 
+# Pre-built row template for the browser history listing
+HISTORY_ROW_FMT = f"  [{{timestamp}}] {Colors.OKGREEN}{{domain}}{Colors.ENDC} - {{title}}"
+
+# Well-known TCP ports, built once rather than per packet
+COMMON_PORTS = {
+    80: 'HTTP',
+    443: 'HTTPS',
+    53: 'DNS',
+    22: 'SSH',
+    21: 'FTP',
+    25: 'SMTP',
+    110: 'POP3',
+    143: 'IMAP',
+    993: 'IMAPS',
+    995: 'POP3S'
+}
+
+NETWORK_ROW_FMT = f"{Colors.WARNING}[{{timestamp}}] NETWORK: {Colors.ENDC}{{dst_ip}}:{{dst_port}} ({{service}})"
+
+# Event timestamps change once a second, so format each second only once
+_clock_cache = (0, '00:00:00')
+
+def current_hms():
+    """Current local time as HH:MM:SS, re-formatted only when the second changes"""
+    global _clock_cache
+    now = int(time.time())
+    cached = _clock_cache
+    if cached[0] != now:
+        cached = (now, time.strftime("%H:%M:%S", time.localtime(now)))
+        _clock_cache = cached
+    return cached[1]
+
+# All monitor output goes through one printer thread: producers (capture, file
+# and window threads) only enqueue, and never block on the terminal
+LOG_FLUSH_INTERVAL = 0.05
+_log_queue = queue.SimpleQueue()
+_printer_thread = None
+_printer_lock = threading.Lock()
+
+def _printer_loop():
+    """Write queued lines to stdout, coalescing everything queued within LOG_FLUSH_INTERVAL"""
+    while True:
+        lines = [_log_queue.get()]
+        deadline = time.monotonic() + LOG_FLUSH_INTERVAL
+        while lines[-1] is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                lines.append(_log_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        
+        stopping = lines[-1] is None
+        if stopping:
+            lines.pop()
+        if lines:
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+        if stopping:
+            return
+
+def log(line):
+    """Queue a line of output for the printer thread"""
+    global _printer_thread
+    if _printer_thread is None:
+        with _printer_lock:
+            if _printer_thread is None:
+                _printer_thread = threading.Thread(target=_printer_loop, daemon=True)
+                _printer_thread.start()
+    _log_queue.put(line)
+
+def stop_printer():
+    """Flush pending output and stop the printer thread"""
+    global _printer_thread
+    with _printer_lock:
+        if _printer_thread is not None:
+            _log_queue.put(None)
+            _printer_thread.join()
+            _printer_thread = None
+
 class WindowMonitor:
     """Monitor active windows and applications"""
     
     def __init__(self):
         self.current_window = None
         self.running = True
+        self._dpy = None
+        self._pid_name_cache = {}
+        
+        # Resolve the platform lookup once instead of testing sys.platform on every poll
+        system = sys.platform.lower()
+        if system.startswith('linux'):
+            self._get_window = self.get_active_window_linux
+        elif system.startswith('darwin'):  # macOS
+            self._get_window = self.get_active_window_mac
+        elif system.startswith('win'):
+            self._get_window = self.get_active_window_windows
+        else:
+            self._get_window = lambda: None
+        
+        if sys.platform.startswith('linux') and XLIB_AVAILABLE:
+            try:
+                # One persistent X connection instead of spawning xdotool per poll
+                self._dpy = Display()
+                self._root = self._dpy.screen().root
+                self._atom_active = self._dpy.intern_atom('_NET_ACTIVE_WINDOW')
+                self._atom_name = self._dpy.intern_atom('_NET_WM_NAME')
+                self._atom_pid = self._dpy.intern_atom('_NET_WM_PID')
+                self._atom_utf8 = self._dpy.intern_atom('UTF8_STRING')
+            except Exception:
+                self._dpy = None
     
     def get_active_window_linux(self):
         """Get active window info on Linux"""
+        if self._dpy is None:
+            return self.get_active_window_xdotool()
+        
+        try:
+            prop = self._root.get_full_property(self._atom_active, X.AnyPropertyType)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            window = self._dpy.create_resource_object('window', prop.value[0])
+            
+            # Get window name
+            name_prop = window.get_full_property(self._atom_name, self._atom_utf8)
+            if name_prop:
+                window_name = name_prop.value.decode('utf-8', 'replace')
+            else:
+                window_name = window.get_wm_name() or "Unknown"
+            
+            # Get process info
+            pid_prop = window.get_full_property(self._atom_pid, X.AnyPropertyType)
+            if pid_prop and pid_prop.value:
+                pid = int(pid_prop.value[0])
+                return {
+                    'title': window_name,
+                    'process': self.get_process_name_linux(pid),
+                    'pid': pid
+                }
+        except Exception as e:
+            pass
+        return None
+    
+    def get_active_window_xdotool(self):
+        """Get active window info on Linux via xdotool (fallback without python-xlib)"""
         try:
             # Get active window ID
             result = subprocess.run(['xdotool', 'getactivewindow'], 
@@ -65,16 +287,23 @@ class WindowMonitor:
                                       capture_output=True, text=True)
                 if result.returncode == 0:
                     pid = int(result.stdout.strip())
-                    process = psutil.Process(pid)
                     return {
                         'title': window_name,
-                        'process': process.name(),
+                        'process': self.get_process_name_linux(pid),
                         'pid': pid
                     }
         except Exception as e:
             pass
         return None
     
+    def get_process_name_linux(self, pid):
+        """Read a process name straight from /proc/PID/comm (one open+read)"""
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                return f.read().rstrip('\n')
+        except OSError:
+            return psutil.Process(pid).name()
+    
     def get_active_window_mac(self):
         """Get active window info on macOS"""
         try:
@@ -106,63 +335,182 @@ class WindowMonitor:
     def get_active_window_windows(self):
         """Get active window info on Windows"""
         try:
-            import win32gui
-            import win32process
+            hwnd = _user32.GetForegroundWindow()
+            if not hwnd:
+                return None
+            
+            length = _user32.GetWindowTextLengthW(hwnd)
+            buf = ctypes.create_unicode_buffer(length + 1)
+            _user32.GetWindowTextW(hwnd, buf, length + 1)
+            
+            pid = wintypes.DWORD()
+            _user32.GetWindowThreadProcessId(hwnd, ctypes.byref(pid))
+            pid = pid.value
             
-            hwnd = win32gui.GetForegroundWindow()
-            window_title = win32gui.GetWindowText(hwnd)
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
+            # Only resolve the image name when we see a new pid
+            process_name = self._pid_name_cache.get(pid)
+            if process_name is None:
+                process_name = self._get_process_name_windows(pid)
+                if len(self._pid_name_cache) >= 256:
+                    self._pid_name_cache.clear()
+                self._pid_name_cache[pid] = process_name
             
             return {
-                'title': window_title,
-                'process': process.name(),
+                'title': buf.value,
+                'process': process_name,
                 'pid': pid
             }
         except Exception as e:
             pass
         return None
     
+    def _get_process_name_windows(self, pid):
+        """Resolve a process executable name via QueryFullProcessImageNameW"""
+        handle = _kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return psutil.Process(pid).name()
+        try:
+            size = wintypes.DWORD(260)
+            buf = ctypes.create_unicode_buffer(size.value)
+            if _kernel32.QueryFullProcessImageNameW(handle, 0, buf, ctypes.byref(size)):
+                return os.path.basename(buf.value)
+            return psutil.Process(pid).name()
+        finally:
+            _kernel32.CloseHandle(handle)
+    
     def get_active_window(self):
         """Get active window info cross-platform"""
-        system = sys.platform.lower()
-        
-        if system.startswith('linux'):
-            return self.get_active_window_linux()
-        elif system.startswith('darwin'):  # macOS
-            return self.get_active_window_mac()
-        elif system.startswith('win'):
-            return self.get_active_window_windows()
-        else:
-            return None
+        return self._get_window()
+    
+    def report_window(self, window_info):
+        """Print the window if it differs from the last one seen"""
+        if window_info and window_info != self.current_window:
+            self.current_window = window_info
+            timestamp = current_hms()
+            
+            log(f"{Colors.OKBLUE}[{timestamp}] WINDOW: {Colors.ENDC}"
+                f"{Colors.BOLD}{window_info['process']}{Colors.ENDC} - "
+                f"{window_info['title'][:60]}...")
     
     def start_monitoring(self):
         """Start window monitoring loop"""
-        print(f"{Colors.HEADER}🪟 Window Monitor Started{Colors.ENDC}")
+        log(f"{Colors.HEADER}🪟 Window Monitor Started{Colors.ENDC}")
+        
+        # Prefer OS focus-change notifications; poll only where none are available
+        if self._dpy is not None:
+            self.watch_x11_events()
+        elif sys.platform.startswith('win'):
+            self.watch_win_events()
+        else:
+            self.poll_windows()
+    
+    def poll_windows(self):
+        """Poll the active window every 2 seconds"""
+        get_window = self._get_window
+        report_window = self.report_window
         
         while self.running:
             try:
-                window_info = self.get_active_window()
+                report_window(get_window())
+                time.sleep(2)  # Check every 2 seconds
                 
-                if window_info and window_info != self.current_window:
-                    self.current_window = window_info
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    
-                    print(f"{Colors.OKBLUE}[{timestamp}] WINDOW: {Colors.ENDC}"
-                          f"{Colors.BOLD}{window_info['process']}{Colors.ENDC} - "
-                          f"{window_info['title'][:60]}...")
+            except KeyboardInterrupt:
+                break
+            except Exception as e:
+                log(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
+                time.sleep(5)
+    
+    def watch_x11_events(self):
+        """Block on X11 PropertyNotify events for focus and title changes"""
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+        watched = None
+        
+        while self.running:
+            try:
+                window_info = self.get_active_window_linux()
+                self.report_window(window_info)
                 
-                time.sleep(2)  # Check every 2 seconds
+                # Also follow title changes (e.g. switching browser tabs) on the active window
+                prop = self._root.get_full_property(self._atom_active, X.AnyPropertyType)
+                active_id = prop.value[0] if prop and prop.value else 0
+                if active_id and active_id != watched:
+                    window = self._dpy.create_resource_object('window', active_id)
+                    window.change_attributes(event_mask=X.PropertyChangeMask)
+                    watched = active_id
+                
+                # Wait for a relevant property change, waking up periodically to honour self.running
+                changed = False
+                while self.running and not changed:
+                    if not self._dpy.pending_events():
+                        select.select([self._dpy], [], [], 1.0)
+                    while self._dpy.pending_events():
+                        event = self._dpy.next_event()
+                        if event.type == X.PropertyNotify and event.atom in (self._atom_active, self._atom_name):
+                            changed = True
                 
             except KeyboardInterrupt:
                 break
             except Exception as e:
-                print(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
+                log(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
                 time.sleep(5)
+    
+    def watch_win_events(self):
+        """Receive foreground/title changes through SetWinEventHook"""
+        def on_event(hook, event, hwnd, id_object, id_child, thread_id, timestamp):
+            if event == EVENT_OBJECT_NAMECHANGE and (
+                    id_object != OBJID_WINDOW or hwnd != _user32.GetForegroundWindow()):
+                return
+            self.report_window(self.get_active_window_windows())
+        
+        # Keep a reference to the callback so it is not garbage collected while hooked
+        callback = WinEventProc(on_event)
+        hooks = [
+            _user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND,
+                                    None, callback, 0, 0, WINEVENT_OUTOFCONTEXT),
+            _user32.SetWinEventHook(EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE,
+                                    None, callback, 0, 0, WINEVENT_OUTOFCONTEXT),
+        ]
+        if not all(hooks):
+            for hook in hooks:
+                if hook:
+                    _user32.UnhookWinEvent(hook)
+            return self.poll_windows()
+        
+        try:
+            self.report_window(self.get_active_window_windows())
+            msg = wintypes.MSG()
+            while self.running:
+                # Hook callbacks are delivered through this thread's message queue
+                _user32.MsgWaitForMultipleObjects(0, None, False, 1000, QS_ALLINPUT)
+                while _user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+                    _user32.TranslateMessage(ctypes.byref(msg))
+                    _user32.DispatchMessageW(ctypes.byref(msg))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for hook in hooks:
+                _user32.UnhookWinEvent(hook)
+
+class _CopiedConnection(sqlite3.Connection):
+    """Connection to a temporary copy of a browser database; closing it removes the copy"""
+    
+    copy_dir = None
+    
+    def close(self):
+        super().close()
+        if self.copy_dir:
+            shutil.rmtree(self.copy_dir, ignore_errors=True)
+            self.copy_dir = None
+    
+    def __del__(self):
+        self.close()
 
 class BrowserHistoryAnalyzer:
     """Analyze browser history from various browsers"""
     
+    # Maximum rows read per browser per poll
+    HISTORY_LIMIT = 50
+    
     def __init__(self):
         self.browsers = {
             'Chrome': self.get_chrome_history,
@@ -170,7 +518,7 @@ class BrowserHistoryAnalyzer:
             'Safari': self.get_safari_history,
             'Edge': self.get_edge_history
         }
-        self.last_check = {}
+        self.last_check = {}  # browser -> newest raw visit timestamp already reported
     
     def get_chrome_history(self):
         """Get Chrome browser history"""
@@ -183,7 +531,7 @@ class BrowserHistoryAnalyzer:
         else:  # Linux
             paths.append(os.path.expanduser('~/.config/google-chrome/Default/History'))
         
-        return self.read_chromium_history(paths)
+        return self.read_chromium_history(paths, 'Chrome')
     
     def get_edge_history(self):
         """Get Edge browser history"""
@@ -196,48 +544,80 @@ class BrowserHistoryAnalyzer:
         else:  # Linux
             paths.append(os.path.expanduser('~/.config/microsoft-edge/Default/History'))
         
-        return self.read_chromium_history(paths)
+        return self.read_chromium_history(paths, 'Edge')
     
-    def read_chromium_history(self, paths):
+    def connect_readonly(self, path):
+        """Open a browser database read-only, including commits still in its WAL"""
+        uri = Path(path).resolve().as_uri()
+        wal = f"{path}-wal"
+        if not os.path.exists(wal) or os.path.getsize(wal) == 0:
+            # Everything is in the main file: immutable=1 reads it in place without
+            # taking locks, so no temporary copy of the (often 100MB) database
+            conn = sqlite3.connect(f"{uri}?immutable=1&mode=ro", uri=True)
+        else:
+            # immutable=1 would ignore the WAL, hiding the newest visits (Firefox
+            # and Safari keep them there until a checkpoint)
+            conn = sqlite3.connect(f"{uri}?mode=ro", uri=True)
+            try:
+                conn.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+            except sqlite3.OperationalError:
+                # The browser holds an exclusive lock: read a copy of the database and its WAL
+                conn.close()
+                copy_dir = tempfile.mkdtemp(prefix='focusflow_history_')
+                try:
+                    copy_path = os.path.join(copy_dir, os.path.basename(path))
+                    shutil.copyfile(path, copy_path)
+                    shutil.copyfile(wal, f"{copy_path}-wal")
+                    conn = sqlite3.connect(copy_path, factory=_CopiedConnection)
+                except Exception:
+                    shutil.rmtree(copy_dir, ignore_errors=True)
+                    raise
+                conn.copy_dir = copy_dir
+        conn.execute("PRAGMA query_only=1")
+        conn.execute("PRAGMA mmap_size=67108864")
+        return conn
+    
+    def build_entries(self, rows):
+        """Build history entries from (url, title, visit_count, raw_time, unix_seconds) rows"""
+        # Each query converts its browser's epoch to Unix seconds in SQL, so only
+        # one datetime construction per row is left on the Python side
+        fromtimestamp = datetime.fromtimestamp
+        return [{
+            'url': url,
+            'title': title or 'No Title',
+            'visit_count': visit_count,
+            'timestamp': fromtimestamp(unix_seconds)
+        } for url, title, visit_count, _, unix_seconds in rows]
+    
+    def read_chromium_history(self, paths, browser):
         """Read history from Chromium-based browsers"""
         entries = []
         
         for path in paths:
             if os.path.exists(path):
                 try:
-                    # Copy to temp file (Chrome locks the original)
-                    temp_path = f"{path}.temp"
-                    import shutil
-                    shutil.copy2(path, temp_path)
-                    
-                    conn = sqlite3.connect(temp_path)
+                    conn = self.connect_readonly(path)
+                    # Only rows newer than the previous poll; served from the last_visit_time index
                     cursor = conn.execute("""
-                        SELECT url, title, visit_count, last_visit_time 
+                        SELECT url, title, visit_count, last_visit_time,
+                               (last_visit_time - ?) / 1000000.0
                         FROM urls 
+                        WHERE last_visit_time > ?
                         ORDER BY last_visit_time DESC 
-                        LIMIT 50
-                    """)
+                        LIMIT ?
+                    """, (CHROMIUM_EPOCH_OFFSET_US, self.last_check.get(browser, 0), self.HISTORY_LIMIT))
+                    
+                    rows = cursor.fetchmany(self.HISTORY_LIMIT)
+                    if rows:
+                        self.last_check[browser] = rows[0][3]
                     
-                    for row in cursor.fetchall():
-                        # Convert Chrome timestamp to datetime
-                        timestamp = datetime.fromtimestamp((row[3] - 11644473600000000) / 1000000)
-                        entries.append({
-                            'url': row[0],
-                            'title': row[1] or 'No Title',
-                            'visit_count': row[2],
-                            'timestamp': timestamp
-                        })
+                    entries = self.build_entries(rows)
                     
                     conn.close()
-                    os.remove(temp_path)
                     break
                     
                 except Exception as e:
-                    print(f"{Colors.WARNING}Error reading Chrome history: {e}{Colors.ENDC}")
-                    try:
-                        os.remove(temp_path)
-                    except:
-                        pass
+                    log(f"{Colors.WARNING}Error reading {browser} history: {e}{Colors.ENDC}")
         
         return entries
     
@@ -258,30 +638,27 @@ class BrowserHistoryAnalyzer:
                 
                 if os.path.exists(places_db):
                     try:
-                        conn = sqlite3.connect(places_db)
+                        conn = self.connect_readonly(places_db)
                         cursor = conn.execute("""
-                            SELECT h.url, h.title, h.visit_count, h.last_visit_date
+                            SELECT h.url, h.title, h.visit_count, h.last_visit_date,
+                                   h.last_visit_date / 1000000.0
                             FROM moz_places h
-                            WHERE h.last_visit_date IS NOT NULL
+                            WHERE h.last_visit_date > ?
                             ORDER BY h.last_visit_date DESC
-                            LIMIT 50
-                        """)
+                            LIMIT ?
+                        """, (self.last_check.get('Firefox', 0), self.HISTORY_LIMIT))
+                        
+                        rows = cursor.fetchmany(self.HISTORY_LIMIT)
+                        if rows:
+                            self.last_check['Firefox'] = rows[0][3]
                         
-                        for row in cursor.fetchall():
-                            if row[3]:
-                                timestamp = datetime.fromtimestamp(row[3] / 1000000)
-                                entries.append({
-                                    'url': row[0],
-                                    'title': row[1] or 'No Title',
-                                    'visit_count': row[2],
-                                    'timestamp': timestamp
-                                })
+                        entries = self.build_entries(rows)
                         
                         conn.close()
                         break
                         
                     except Exception as e:
-                        print(f"{Colors.WARNING}Error reading Firefox history: {e}{Colors.ENDC}")
+                        log(f"{Colors.WARNING}Error reading Firefox history: {e}{Colors.ENDC}")
         
         return entries
     
@@ -296,113 +673,190 @@ class BrowserHistoryAnalyzer:
         
         if os.path.exists(history_path):
             try:
-                conn = sqlite3.connect(history_path)
+                conn = self.connect_readonly(history_path)
+                # One row per history item (visit_count lives on the item), with the
+                # title of its most recent visit; SQLite takes bare columns from the MAX() row
                 cursor = conn.execute("""
-                    SELECT url, title, visit_count, visit_time
-                    FROM history_visits hv
-                    JOIN history_items hi ON hv.history_item = hi.id
-                    ORDER BY visit_time DESC
-                    LIMIT 50
-                """)
+                    SELECT hi.url, hv.title, hi.visit_count, MAX(hv.visit_time),
+                           MAX(hv.visit_time) + ?
+                    FROM history_items hi
+                    JOIN history_visits hv ON hv.history_item = hi.id
+                    WHERE hv.visit_time > ?
+                    GROUP BY hi.id
+                    ORDER BY 4 DESC
+                    LIMIT ?
+                """, (COCOA_EPOCH, self.last_check.get('Safari', 0), self.HISTORY_LIMIT))
+                
+                rows = cursor.fetchmany(self.HISTORY_LIMIT)
+                if rows:
+                    self.last_check['Safari'] = rows[0][3]
                 
-                for row in cursor.fetchall():
-                    # Safari uses different timestamp format
-                    timestamp = datetime.fromtimestamp(row[3] + 978307200)  # Safari epoch adjustment
-                    entries.append({
-                        'url': row[0],
-                        'title': row[1] or 'No Title',
-                        'visit_count': row[2],
-                        'timestamp': timestamp
-                    })
+                entries = self.build_entries(rows)
                 
                 conn.close()
                 
             except Exception as e:
-                print(f"{Colors.WARNING}Error reading Safari history: {e}{Colors.ENDC}")
+                log(f"{Colors.WARNING}Error reading Safari history: {e}{Colors.ENDC}")
         
         return entries
     
     def analyze_recent_history(self):
         """Analyze recent browser history"""
-        print(f"{Colors.HEADER}🌐 Browser History Analysis{Colors.ENDC}")
+        log(f"{Colors.HEADER}🌐 Browser History Analysis{Colors.ENDC}")
         
-        for browser_name, get_history_func in self.browsers.items():
-            entries = get_history_func()
+        # The per-browser reads are independent I/O (SQLite releases the GIL while
+        # stepping), so run them together; results are still shown in browser order
+        with ThreadPoolExecutor(max_workers=len(self.browsers)) as executor:
+            futures = {browser_name: executor.submit(get_history_func)
+                       for browser_name, get_history_func in self.browsers.items()}
+        
+        for browser_name, future in futures.items():
+            entries = future.result()
             
             if entries:
-                print(f"\n{Colors.OKCYAN}📊 {browser_name} - Recent Activity:{Colors.ENDC}")
+                lines = [f"\n{Colors.OKCYAN}📊 {browser_name} - Recent Activity:{Colors.ENDC}"]
                 
                 # Show last 10 entries
                 for entry in entries[:10]:
-                    timestamp = entry['timestamp'].strftime("%H:%M:%S")
-                    title = entry['title'][:50] + "..." if len(entry['title']) > 50 else entry['title']
-                    domain = entry['url'].split('/')[2] if len(entry['url'].split('/')) > 2 else entry['url']
-                    
-                    print(f"  [{timestamp}] {Colors.OKGREEN}{domain}{Colors.ENDC} - {title}")
+                    title = entry['title']
+                    lines.append(HISTORY_ROW_FMT.format(
+                        timestamp=entry['timestamp'].strftime("%H:%M:%S"),
+                        domain=urlsplit(entry['url']).netloc or entry['url'],
+                        title=title[:50] + "..." if len(title) > 50 else title
+                    ))
+                
+                # One queued write per browser instead of one per row
+                log("\n".join(lines))
 
 class NetworkMonitor:
     """Monitor network traffic"""
     
+    # Kernel-side capture filter: only IPv4 TCP, local traffic never reaches Python
+    BPF_FILTER = "ip and tcp and not net 127.0.0.0/8"
+    # Upper bound on remembered connections (LRU eviction beyond this)
+    MAX_CONNECTIONS = 4096
+    
+    # Raw-socket capture (Linux): Ethernet frame offsets and BPF constants
+    ETH_P_IP = 0x0800
+    SO_ATTACH_FILTER = getattr(socket, 'SO_ATTACH_FILTER', 26)
+    SNAPLEN = 128  # enough for Ethernet + IPv4 with options + TCP ports
+    ETH_HLEN = 14
+    
+    # Hand-assembled equivalent of BPF_FILTER for Ethernet frames:
+    # (code, jt, jf, k) as in struct sock_filter
+    BPF_PROGRAM = (
+        (0x28, 0, 0, 12),      # ldh [12]            ; ethertype
+        (0x15, 0, 6, 0x0800),  # jeq #IPv4, else drop
+        (0x30, 0, 0, 23),      # ldb [23]            ; IP protocol
+        (0x15, 0, 4, 6),       # jeq #TCP, else drop
+        (0x30, 0, 0, 26),      # ldb [26]            ; first octet of source
+        (0x15, 2, 0, 127),     # jeq #127 -> drop
+        (0x30, 0, 0, 30),      # ldb [30]            ; first octet of destination
+        (0x15, 0, 1, 127),     # jeq #127 -> drop, else accept
+        (0x06, 0, 0, 0),       # ret #0              ; drop
+        (0x06, 0, 0, SNAPLEN), # ret #SNAPLEN        ; accept, truncated
+    )
+    
     def __init__(self):
         self.running = True
-        self.connections = set()
+        self.connections = OrderedDict()
+        self.sniffer = None
     
     def packet_callback(self, packet):
         """Callback for packet analysis"""
-        if IP in packet and TCP in packet:
-            src_ip = packet[IP].src
-            dst_ip = packet[IP].dst
-            dst_port = packet[TCP].dport
-            
-            # Filter out local traffic
-            if not (src_ip.startswith('127.') or dst_ip.startswith('127.')):
-                connection = f"{dst_ip}:{dst_port}"
-                
-                if connection not in self.connections:
-                    self.connections.add(connection)
-                    timestamp = datetime.now().strftime("%H:%M:%S")
-                    
-                    # Try to identify service by port
-                    service = self.identify_service(dst_port)
-                    
-                    print(f"{Colors.WARNING}[{timestamp}] NETWORK: {Colors.ENDC}"
-                          f"{dst_ip}:{dst_port} ({service})")
+        # The BPF filter guarantees an IPv4/TCP packet with no loopback endpoint
+        self.record_connection(packet[IP].dst, packet[TCP].dport)
+    
+    def record_connection(self, dst_ip, dst_port):
+        """Report a destination the first time it is seen"""
+        connection = f"{dst_ip}:{dst_port}"
+        
+        if connection in self.connections:
+            self.connections.move_to_end(connection)
+        else:
+            self.connections[connection] = None
+            if len(self.connections) > self.MAX_CONNECTIONS:
+                self.connections.popitem(last=False)
+            log(NETWORK_ROW_FMT.format(
+                timestamp=current_hms(),
+                dst_ip=dst_ip,
+                dst_port=dst_port,
+                service=self.identify_service(dst_port)  # Try to identify service by port
+            ))
     
     def identify_service(self, port):
         """Identify service by port number"""
-        common_ports = {
-            80: 'HTTP',
-            443: 'HTTPS',
-            53: 'DNS',
-            22: 'SSH',
-            21: 'FTP',
-            25: 'SMTP',
-            110: 'POP3',
-            143: 'IMAP',
-            993: 'IMAPS',
-            995: 'POP3S'
-        }
-        return common_ports.get(port, 'Unknown')
+        return COMMON_PORTS.get(port, 'Unknown')
     
     def start_monitoring(self):
         """Start network monitoring"""
-        if not SCAPY_AVAILABLE:
-            print(f"{Colors.FAIL}Network monitoring unavailable - Scapy not installed{Colors.ENDC}")
+        if not NETWORK_AVAILABLE:
+            log(f"{Colors.FAIL}Network monitoring unavailable - Scapy not installed{Colors.ENDC}")
             return
         
-        print(f"{Colors.HEADER}🌐 Network Monitor Started{Colors.ENDC}")
-        print(f"{Colors.WARNING}Note: May require root/admin privileges{Colors.ENDC}")
+        log(f"{Colors.HEADER}🌐 Network Monitor Started{Colors.ENDC}")
+        log(f"{Colors.WARNING}Note: May require root/admin privileges{Colors.ENDC}")
         
         try:
-            sniff(prn=self.packet_callback, store=0)
+            if RAW_CAPTURE_AVAILABLE:
+                self.capture_raw()
+            else:
+                self.sniffer = AsyncSniffer(filter=self.BPF_FILTER, prn=self.packet_callback,
+                                            store=False, iface=conf.iface)
+                self.sniffer.start()
+                self.sniffer.join()
         except PermissionError:
-            print(f"{Colors.FAIL}Permission denied - try running as admin/root{Colors.ENDC}")
+            log(f"{Colors.FAIL}Permission denied - try running as admin/root{Colors.ENDC}")
         except Exception as e:
-            print(f"{Colors.FAIL}Network monitoring error: {e}{Colors.ENDC}")
+            log(f"{Colors.FAIL}Network monitoring error: {e}{Colors.ENDC}")
+    
+    def capture_raw(self):
+        """Capture on an AF_PACKET socket with the BPF program attached, bypassing Scapy"""
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(self.ETH_P_IP))
+        try:
+            insns = b''.join(struct.pack('HBBI', *insn) for insn in self.BPF_PROGRAM)
+            program = ctypes.create_string_buffer(insns)
+            fprog = struct.pack('HL', len(self.BPF_PROGRAM), ctypes.addressof(program))
+            sock.setsockopt(socket.SOL_SOCKET, self.SO_ATTACH_FILTER, fprog)
+            sock.setblocking(False)
+            
+            buf = bytearray(self.SNAPLEN)
+            while self.running:
+                # Wake up periodically so stop() is honoured
+                ready, _, _ = select.select([sock], [], [], 1.0)
+                if not ready:
+                    continue
+                
+                while True:
+                    try:
+                        size = sock.recv_into(buf)
+                    except BlockingIOError:
+                        break
+                    
+                    # Only the destination address and port are needed
+                    ihl = (buf[self.ETH_HLEN] & 0x0F) * 4
+                    port_offset = self.ETH_HLEN + ihl + 2
+                    if size < port_offset + 2:
+                        continue
+                    dst_ip = socket.inet_ntoa(buf[30:34])
+                    dst_port = struct.unpack_from('!H', buf, port_offset)[0]
+                    self.record_connection(dst_ip, dst_port)
+        finally:
+            sock.close()
+    
+    def stop(self):
+        """Stop packet capture"""
+        self.running = False
+        if self.sniffer and self.sniffer.running:
+            self.sniffer.stop()
 
 class FileSystemWatcher:
     """Monitor file system changes"""
     
+    # watchfiles batching: wait up to DEBOUNCE ms for a burst to settle, checking every STEP ms
+    DEBOUNCE_MS = 1600
+    STEP_MS = 50
+    
     def __init__(self, watch_paths=None):
         self.watch_paths = watch_paths or [
             os.path.expanduser('~/Documents'),
@@ -410,69 +864,133 @@ class FileSystemWatcher:
             os.path.expanduser('~/Downloads'),
             os.getcwd()  # Current directory
         ]
-        self.observer = Observer()
+        self.observer = None
+        self._stop_event = threading.Event()
+        self._thread = None
     
     def start_monitoring(self):
         """Start file system monitoring"""
-        print(f"{Colors.HEADER}📁 File System Monitor Started{Colors.ENDC}")
+        log(f"{Colors.HEADER}📁 File System Monitor Started{Colors.ENDC}")
         
         event_handler = FileChangeHandler()
+        paths = [path for path in self.watch_paths if os.path.exists(path)]
         
-        for path in self.watch_paths:
-            if os.path.exists(path):
-                print(f"  Watching: {path}")
+        for path in paths:
+            log(f"  Watching: {path}")
+        
+        if WATCHFILES_AVAILABLE:
+            # Rust/notify backend delivers debounced batches instead of one callback per event
+            self._thread = threading.Thread(target=self._watch_changes,
+                                            args=(paths, event_handler), daemon=True)
+            self._thread.start()
+        else:
+            self.observer = Observer()
+            for path in paths:
                 self.observer.schedule(event_handler, path, recursive=True)
+            self.observer.start()
+    
+    def _watch_changes(self, paths, event_handler):
+        """Consume change batches from watchfiles"""
+        if not paths:
+            return
+        
+        default_filter = DefaultFilter()
+        
+        def watch_filter(change, path):
+            if not default_filter(change, path) or event_handler.should_ignore(path):
+                return False
+            return change == Change.deleted or not os.path.isdir(path)
         
-        self.observer.start()
-        return self.observer
+        change_types = {
+            Change.added: 'created',
+            Change.modified: 'modified',
+            Change.deleted: 'deleted',
+        }
+        
+        for changes in watch(*paths, watch_filter=watch_filter, debounce=self.DEBOUNCE_MS,
+                             step=self.STEP_MS, stop_event=self._stop_event):
+            event_handler.report({path: change_types[change] for change, path in changes})
+    
+    def stop(self):
+        """Stop file system monitoring"""
+        self._stop_event.set()
+        if self.observer:
+            self.observer.stop()
+            self.observer.join()
+        if self._thread:
+            self._thread.join()
 
 class FileChangeHandler(FileSystemEventHandler):
     """Handle file system events"""
     
+    # Events are collected for this long and then printed once per path
+    FLUSH_DELAY = 0.2
+    
+    EVENT_LABELS = {
+        'modified': (Colors.OKGREEN, 'FILE MODIFIED'),
+        'created': (Colors.OKCYAN, 'FILE CREATED'),
+        'deleted': (Colors.FAIL, 'FILE DELETED'),
+    }
+    
     def __init__(self):
         self.ignored_extensions = {'.tmp', '.log', '.swp', '.lock', '.DS_Store'}
-        self.last_event_time = {}
+        self._pending = {}  # path -> last event type seen in the current window
+        self._lock = threading.Lock()
+        self._timer = None
     
     def should_ignore(self, path):
         """Check if file should be ignored"""
-        file_path = Path(path)
+        # Plain string slicing: no Path object per event
+        name = path.rsplit(os.sep, 1)[-1]
         
-        # Ignore system files and temporary files
-        if file_path.suffix in self.ignored_extensions:
+        if name.startswith('.'):
             return True
         
-        if file_path.name.startswith('.'):
-            return True
+        # Ignore system files and temporary files
+        dot = name.rfind('.')
+        return dot > 0 and name[dot:] in self.ignored_extensions
+    
+    def record(self, event_type, path):
+        """Queue an event; bursts on the same path collapse into one line"""
+        with self._lock:
+            self._pending[path] = event_type
+            if self._timer is None:
+                self._timer = threading.Timer(self.FLUSH_DELAY, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def _flush(self):
+        """Print the deduplicated events collected since the last flush"""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._timer = None
         
-        # Rate limiting - ignore rapid successive events
-        now = time.time()
-        if path in self.last_event_time:
-            if now - self.last_event_time[path] < 1:  # 1 second cooldown
-                return True
+        self.report(pending)
+    
+    def report(self, pending):
+        """Print one line per path from a {path: event type} mapping"""
+        timestamp = current_hms()
+        lines = []
+        for path, event_type in pending.items():
+            color, label = self.EVENT_LABELS[event_type]
+            filename = os.path.basename(path)
+            
+            lines.append(f"{color}[{timestamp}] {label}: {Colors.ENDC}{filename}")
         
-        self.last_event_time[path] = now
-        return False
+        if lines:
+            log("\n".join(lines))
     
     def on_modified(self, event):
         if not event.is_directory and not self.should_ignore(event.src_path):
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            filename = os.path.basename(event.src_path)
-            
-            print(f"{Colors.OKGREEN}[{timestamp}] FILE MODIFIED: {Colors.ENDC}{filename}")
+            self.record('modified', event.src_path)
     
     def on_created(self, event):
         if not event.is_directory and not self.should_ignore(event.src_path):
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            filename = os.path.basename(event.src_path)
-            
-            print(f"{Colors.OKCYAN}[{timestamp}] FILE CREATED: {Colors.ENDC}{filename}")
+            self.record('created', event.src_path)
     
     def on_deleted(self, event):
         if not event.is_directory and not self.should_ignore(event.src_path):
-            timestamp = datetime.now().strftime("%H:%M:%S")
-            filename = os.path.basename(event.src_path)
-            
-            print(f"{Colors.FAIL}[{timestamp}] FILE DELETED: {Colors.ENDC}{filename}")
+            self.record('deleted', event.src_path)
 
 class ActivityTracker:
     """Main activity tracker class"""
@@ -485,61 +1003,60 @@ class ActivityTracker:
         self.running = True
     
     def start_all_monitors(self):
-        """Start all monitoring threads"""
-        print(f"{Colors.BOLD}🚀 Activity Tracker Starting...{Colors.ENDC}\n")
+        """Start all monitors on one asyncio event loop"""
+        log(f"{Colors.BOLD}🚀 Activity Tracker Starting...{Colors.ENDC}\n")
         
-        # Start file system monitoring
-        file_observer = self.file_watcher.start_monitoring()
-        
-        # Start window monitoring in a thread
-        window_thread = threading.Thread(target=self.window_monitor.start_monitoring, daemon=True)
-        window_thread.start()
+        try:
+            asyncio.run(self.run_monitors())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop_printer()
+    
+    async def run_monitors(self):
+        """Run the monitors as tasks until cancelled (Ctrl-C)"""
+        # Start file system monitoring (watchfiles/watchdog run their own watcher)
+        self.file_watcher.start_monitoring()
         
-        # Start network monitoring in a thread (optional)
-        if SCAPY_AVAILABLE:
-            network_thread = threading.Thread(target=self.network_monitor.start_monitoring, daemon=True)
-            network_thread.start()
+        # Window and network monitors block on OS events, so they run in executor
+        # threads; browser analysis is a plain task that sleeps on the loop
+        tasks = [
+            asyncio.to_thread(self.window_monitor.start_monitoring),
+            self.analyze_history_periodically(),
+        ]
+        if NETWORK_AVAILABLE:
+            tasks.append(asyncio.to_thread(self.network_monitor.start_monitoring))
         
-        # Analyze browser history periodically
         try:
-            while self.running:
-                time.sleep(30)  # Check browser history every 30 seconds
-                self.browser_analyzer.analyze_recent_history()
-                print(f"\n{Colors.HEADER}{'='*60}{Colors.ENDC}")
-                
-        except KeyboardInterrupt:
-            print(f"\n{Colors.WARNING}🛑 Stopping Activity Tracker...{Colors.ENDC}")
-            self.window_monitor.running = False
-            self.network_monitor.running = False
-            file_observer.stop()
-            file_observer.join()
+            await asyncio.gather(*tasks)
+        finally:
+            log(f"\n{Colors.WARNING}🛑 Stopping Activity Tracker...{Colors.ENDC}")
+            self.stop_all_monitors()
+    
+    async def analyze_history_periodically(self):
+        """Analyze browser history every 30 seconds"""
+        while self.running:
+            await asyncio.sleep(30)  # Cancellable, so Ctrl-C does not wait out the interval
+            await asyncio.to_thread(self.browser_analyzer.analyze_recent_history)
+            log(f"\n{Colors.HEADER}{'='*60}{Colors.ENDC}")
+    
+    def stop_all_monitors(self):
+        """Signal every monitor to stop; blocking monitors exit within about a second"""
+        self.running = False
+        self.window_monitor.running = False
+        self.network_monitor.stop()
+        self.file_watcher.stop()
 
 def main():
     """Main function"""
     print(f"{Colors.BOLD}Activity Tracker - System Monitor{Colors.ENDC}")
     print(f"{Colors.HEADER}{'='*50}{Colors.ENDC}")
     
-    # Check dependencies
-    missing_deps = []
-    
-    try:
-        import psutil
-    except ImportError:
-        missing_deps.append('psutil')
-    
-    try:
-        from watchdog.observers import Observer
-    except ImportError:
-        missing_deps.append('watchdog')
-    
-    if missing_deps:
-        print(f"{Colors.FAIL}Missing dependencies: {', '.join(missing_deps)}{Colors.ENDC}")
-        print(f"Install with: pip install {' '.join(missing_deps)}")
-        return
+    # psutil and watchdog are imported at module load, so reaching main() means they exist
     
     # Check OS-specific tools
-    if sys.platform.startswith('linux'):
-        if not subprocess.run(['which', 'xdotool'], capture_output=True).returncode == 0:
+    if sys.platform.startswith('linux') and not XLIB_AVAILABLE:
+        if shutil.which('xdotool') is None:
             print(f"{Colors.WARNING}Warning: xdotool not found. Install with: sudo apt-get install xdotool{Colors.ENDC}")
     
     tracker = ActivityTracker()
@@ -3,6 +3,20 @@ echo "Setting up Activity Tracker..."
 # Install Python dependencies
 pip install psutil watchdog scapy
 
+# Optional: direct X11 window queries on Linux (falls back to xdotool)
+pip install python-xlib
+
+# Optional: native batched file watching (falls back to watchdog)
+pip install watchfiles
+
+# Optional: faster JSON parsing of Ollama responses in v4 (falls back to json)
+pip install orjson
+
+# Optional: in-process window queries on macOS (falls back to osascript)
+if [ "$(uname)" = "Darwin" ]; then
+    pip install pyobjc-framework-Quartz
+fi
+
 # Install system dependencies based on OS
 if command -v apt-get > /dev/null; then
     echo "Installing xdotool for Ubuntu/Debian..."
@@ -16,6 +30,11 @@ elif command -v pacman > /dev/null; then
     sudo pacman -S --noconfirm xdotool
 fi
 
+# Write the bytecode caches now so the first run doesn't compile the trackers
+echo "Precompiling trackers..."
+python -m compileall -q activity_tracker.py v2.py v3.py v4.py
+
+# Run as modules (-m) so Python loads the cached bytecode; a script path is recompiled every time
 echo "Setup complete! Run with:"
-echo "  python activity_tracker.py    (basic monitoring)"
-echo "  sudo python activity_tracker.py    (full monitoring with network)"
\ No newline at end of file
+echo "  python -m activity_tracker    (basic monitoring)"
+echo "  sudo python -m activity_tracker    (full monitoring with network)"
\ No newline at end of file
@@ -4,31 +4,73 @@ Enhanced Focus Tracker with Time Analysis and Goal-Based Classification
 Built on top of the comprehensive activity tracker
 """
 
-import os
 import sys
 import time
+import atexit
 import sqlite3
+import select
+import ctypes
 import threading
 import subprocess
+import importlib
+import importlib.util
 from datetime import datetime, timedelta
-from pathlib import Path
-import json
 import re
-from collections import defaultdict, deque
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
-import hashlib
+import functools
+from collections import OrderedDict, deque
+from array import array
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
 
-# Your existing imports
-import psutil
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+try:
+    from Xlib import X
+    from Xlib.display import Display
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
 
 try:
-    from scapy.all import sniff, IP, TCP
-    SCAPY_AVAILABLE = True
+    from AppKit import NSWorkspace
+    from Quartz import (
+        CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly,
+        kCGWindowListExcludeDesktopElements, kCGNullWindowID
+    )
+    PYOBJC_AVAILABLE = True
 except ImportError:
-    SCAPY_AVAILABLE = False
+    PYOBJC_AVAILABLE = False
+
+if sys.platform.startswith('win'):
+    from ctypes import wintypes
+    
+    _user32 = ctypes.WinDLL('user32', use_last_error=True)
+    
+    # Foreground-change notifications (SetWinEventHook)
+    EVENT_SYSTEM_FOREGROUND = 0x0003
+    EVENT_OBJECT_NAMECHANGE = 0x800C
+    WINEVENT_OUTOFCONTEXT = 0x0000
+    OBJID_WINDOW = 0
+    QS_ALLINPUT = 0x04FF
+    PM_REMOVE = 0x0001
+    
+    WinEventProc = ctypes.WINFUNCTYPE(
+        None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+        wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD
+    )
+    _user32.GetForegroundWindow.restype = wintypes.HWND
+    _user32.SetWinEventHook.restype = wintypes.HANDLE
+    _user32.SetWinEventHook.argtypes = [
+        wintypes.DWORD, wintypes.DWORD, wintypes.HMODULE, WinEventProc,
+        wintypes.DWORD, wintypes.DWORD, wintypes.DWORD
+    ]
+    _user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+    _user32.MsgWaitForMultipleObjects.argtypes = [
+        wintypes.DWORD, ctypes.c_void_p, wintypes.BOOL, wintypes.DWORD, wintypes.DWORD
+    ]
+    _user32.PeekMessageW.argtypes = [
+        ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT, wintypes.UINT
+    ]
+    _user32.TranslateMessage.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    _user32.DispatchMessageW.argtypes = [ctypes.POINTER(wintypes.MSG)]
 
 # Enhanced color scheme
 class Colors:
@@ -46,22 +88,86 @@ class Colors:
     INDIRECT = '\033[94m'    # Blue
     DISTRACTION = '\033[91m' # Red
 
+# Per-classification display styles, shared by every display path
+_CLASS_COLOR = {
+    'DIRECT': Colors.DIRECT,
+    'PERIPHERAL': Colors.WARNING,
+    'INDIRECT': Colors.OKBLUE,
+    'DISTRACTION': Colors.FAIL
+}
+_CLASS_EMOJI = {
+    'DIRECT': '🟢',
+    'PERIPHERAL': '🟡',
+    'INDIRECT': '🟠',
+    'DISTRACTION': '🔴'
+}
+
+# Browser title patterns for domain extraction, compiled once at import
+BROWSER_PATTERNS = (
+    re.compile(r'- ([^-]+\.com)', re.IGNORECASE),  # "Title - domain.com - Browser"
+    re.compile(r'([^|\s]+\.[a-z]{2,4})', re.IGNORECASE),  # Basic domain matching
+)
+
+def _psutil():
+    """Import psutil on first use; only the window lookups need it"""
+    return importlib.import_module('psutil')
+
+# Relevance classes, most to least focused; FocusSession stores their index
+CLASSIFICATIONS = ('DIRECT', 'PERIPHERAL', 'INDIRECT', 'DISTRACTION')
+CLASS_IDS = {name: i for i, name in enumerate(CLASSIFICATIONS)}
+
+@functools.lru_cache(maxsize=64)
+def compile_keyword_matcher(keywords: Tuple[str, ...]) -> re.Pattern:
+    """Compile lowercase keywords into one alternation whose search() is true when any is a substring"""
+    return re.compile('|'.join(re.escape(k) for k in set(keywords)))
+
 @dataclass
 class FocusSession:
-    """Data class for focus session tracking"""
+    """Data class for focus session tracking
+    
+    Finished activities are kept column-wise in parallel buffers (packed
+    arrays for the numeric fields) rather than as one Activity per event.
+    """
     goal: str
     start_time: datetime
     end_time: Optional[datetime] = None
-    activities: List = None
-    
-    def __post_init__(self):
-        if self.activities is None:
-            self.activities = []
+    timestamps: array = field(default_factory=lambda: array('d'))  # unix seconds
+    durations_s: array = field(default_factory=lambda: array('d'))
+    class_ids: array = field(default_factory=lambda: array('b'))  # index into CLASSIFICATIONS
+    scores: array = field(default_factory=lambda: array('d'))
+    titles: List[str] = field(default_factory=list)
+    processes: List[str] = field(default_factory=list)
+    urls: List[Optional[str]] = field(default_factory=list)
+    tags: List[Optional[str]] = field(default_factory=list)
     
     @property
     def duration(self) -> timedelta:
         end = self.end_time or datetime.now()
         return end - self.start_time
+    
+    @property
+    def activity_count(self) -> int:
+        return len(self.timestamps)
+    
+    def add_activity(self, activity: 'Activity'):
+        """Append a finished activity to the column buffers"""
+        self.timestamps.append(activity.timestamp.timestamp())
+        self.durations_s.append(activity.duration.total_seconds() if activity.duration else 0.0)
+        self.class_ids.append(CLASS_IDS[activity.classification])
+        self.scores.append(activity.relevance_score)
+        self.titles.append(activity.title)
+        self.processes.append(activity.process)
+        self.urls.append(activity.url)
+        self.tags.append(','.join(activity.tags) if activity.tags else None)
+    
+    def activity_rows(self, session_id: int):
+        """Yield activities insert parameters straight from the column buffers"""
+        for ts, dur, class_id, score, title, process, url, tags in zip(
+                self.timestamps, self.durations_s, self.class_ids, self.scores,
+                self.titles, self.processes, self.urls, self.tags):
+            # Back to datetime so the column gets the same text as v3/v4 rows
+            yield (session_id, datetime.fromtimestamp(ts), title, process, url, CLASSIFICATIONS[class_id],
+                   score, int(dur), tags)
 
 @dataclass
 class Activity:
@@ -111,6 +217,9 @@ class ContentAnalyzer:
             'gaming': 0.15,
         }
         
+        # One lookup table for base scores; distraction entries override
+        self._domain_scores = {**self.educational_domains, **self.distraction_domains}
+        
         # Keywords for different subjects
         self.subject_keywords = {
             'deep_learning': [
@@ -127,28 +236,35 @@ class ContentAnalyzer:
                 'entanglement', 'quantum algorithm', 'quantum physics'
             ]
         }
+        
+        # One compiled matcher per subject: a single regex pass over the
+        # lowercased goal replaces a Python loop of substring checks
+        self._subject_res = []
+        for keywords in self.subject_keywords.values():
+            keywords = tuple(k.lower() for k in keywords)
+            self._subject_res.append((compile_keyword_matcher(keywords), keywords))
+        
+        # Titles repeat constantly (the same tab refocused), so memoize the
+        # per-window work; a hit is a single dict lookup
+        self.extract_domain = functools.lru_cache(maxsize=4096)(self._extract_domain_impl)
+        self.calculate_relevance_score = functools.lru_cache(maxsize=2048)(self._relevance_impl)
     
-    def extract_domain(self, title: str, process: str) -> str:
+    def clear_caches(self):
+        """Drop memoized domains and scores (called when a new session starts)"""
+        self.extract_domain.cache_clear()
+        self.calculate_relevance_score.cache_clear()
+    
+    def _extract_domain_impl(self, title: str, process: str) -> str:
         """Extract domain from window title or process"""
-        # Common browser title patterns
-        browser_patterns = [
-            r'- ([^-]+\.com)',  # "Title - domain.com - Browser"
-            r'([^|\s]+\.[a-z]{2,4})',  # Basic domain matching
-            r'YouTube',  # Direct platform mentions
-            r'Wikipedia',
-            r'GitHub',
-            r'Stack Overflow'
-        ]
-        
         title_lower = title.lower()
         
         # Direct domain extraction from title
-        for pattern in browser_patterns:
-            match = re.search(pattern, title, re.IGNORECASE)
+        for pattern in BROWSER_PATTERNS:
+            match = pattern.search(title)
             if match:
                 return match.group(1).lower()
         
-        # Platform detection
+        # Platform detection (direct platform mentions)
         if 'youtube' in title_lower:
             return 'youtube.com'
         elif 'wikipedia' in title_lower:
@@ -160,38 +276,29 @@ class ContentAnalyzer:
         
         return process.lower()
     
-    def calculate_relevance_score(self, title: str, goal: str, domain: str) -> Tuple[float, str]:
-        """Calculate how relevant content is to the study goal"""
-        title_lower = title.lower()
+    def goal_keywords(self, goal: str) -> Tuple[str, ...]:
+        """Pick the lowercase keywords for a study goal"""
         goal_lower = goal.lower()
         
-        # Base score from domain
-        base_score = self.educational_domains.get(domain, 0.5)
-        
-        # Penalty for known distraction domains
-        if domain in self.distraction_domains:
-            base_score = self.distraction_domains[domain]
-        
-        # Content analysis based on goal
-        content_score = 0.0
-        matching_keywords = []
-        
         # Find relevant keyword set based on goal
-        goal_keywords = []
-        for subject, keywords in self.subject_keywords.items():
-            if any(keyword in goal_lower for keyword in keywords):
-                goal_keywords.extend(keywords)
-                break
+        for subject_re, keywords in self._subject_res:
+            if subject_re.search(goal_lower):
+                return keywords
         
         # If no predefined keywords, use goal words directly
-        if not goal_keywords:
-            goal_keywords = goal_lower.split()
+        return tuple(goal_lower.split())
+    
+    def _relevance_impl(self, title: str, goal: str, domain: str) -> Tuple[float, str]:
+        """Calculate how relevant content is to the study goal"""
+        return self._score(title.lower(), domain, self.goal_keywords(goal))
+    
+    def _score(self, title_lower: str, domain: str, keywords: Tuple[str, ...]) -> Tuple[float, str]:
+        """Score a lowercased title against a goal's resolved keywords"""
+        # Base score from domain (distraction penalties take precedence)
+        base_score = self._domain_scores.get(domain, 0.5)
         
-        # Check for keyword matches in title
-        for keyword in goal_keywords:
-            if keyword.lower() in title_lower:
-                content_score += 0.1
-                matching_keywords.append(keyword)
+        # Check for keyword matches in title (containment, so nested keywords all count)
+        content_score = 0.1 * sum(keyword in title_lower for keyword in keywords)
         
         # Combine scores
         final_score = min((base_score + content_score) / 2, 1.0)
@@ -211,79 +318,112 @@ class ContentAnalyzer:
 class FocusDatabase:
     """Database management for focus sessions"""
     
+    ACTIVITY_INSERT = '''
+        INSERT INTO activities 
+        (session_id, timestamp, title, process, url, classification, 
+         relevance_score, duration, tags)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    
     def __init__(self, db_path: str = "focus_tracker.db"):
         self.db_path = db_path
+        # One long-lived connection per thread; WAL lets the monitor thread
+        # write while the main thread reads without sharing a connection
+        self._tls = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        atexit.register(self.close)
         self.init_database()
     
+    def _conn(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._tls, 'conn', None)
+        if conn is None:
+            # Autocommit mode; writes are batched explicitly with `with conn:` transactions.
+            # check_same_thread is off only so close() can run from the exiting thread
+            conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            conn.execute('PRAGMA temp_store=MEMORY')
+            self._tls.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
     def init_database(self):
         """Initialize the focus tracking database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Sessions table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                goal TEXT NOT NULL,
-                start_time TIMESTAMP NOT NULL,
-                end_time TIMESTAMP,
-                total_duration INTEGER,
-                focus_score REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Activities table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                timestamp TIMESTAMP NOT NULL,
-                title TEXT NOT NULL,
-                process TEXT NOT NULL,
-                url TEXT,
-                classification TEXT NOT NULL,
-                relevance_score REAL NOT NULL,
-                duration INTEGER,
-                tags TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        conn = self._conn()
+        with conn:
+            cursor = conn.cursor()
+            
+            # Sessions table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    goal TEXT NOT NULL,
+                    start_time TIMESTAMP NOT NULL,
+                    end_time TIMESTAMP,
+                    total_duration INTEGER,
+                    focus_score REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Activities table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activities (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id INTEGER,
+                    timestamp TIMESTAMP NOT NULL,
+                    title TEXT NOT NULL,
+                    process TEXT NOT NULL,
+                    url TEXT,
+                    classification TEXT NOT NULL,
+                    relevance_score REAL NOT NULL,
+                    duration INTEGER,
+                    tags TEXT,
+                    FOREIGN KEY (session_id) REFERENCES sessions (id)
+                )
+            ''')
+            
+            # Indexes for per-session timelines and classification rollups
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_activities_session_ts
+                ON activities (session_id, timestamp)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_activities_classification
+                ON activities (classification)
+            ''')
+    
+    def close(self):
+        """Close every per-thread connection"""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._tls = threading.local()
     
     def save_session(self, session: FocusSession) -> int:
         """Save a focus session to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO sessions (goal, start_time, end_time, total_duration)
-            VALUES (?, ?, ?, ?)
-        ''', (
-            session.goal,
-            session.start_time,
-            session.end_time,
-            int(session.duration.total_seconds()) if session.end_time else None
-        ))
-        
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return session_id
+        conn = self._conn()
+        with conn:
+            cursor = conn.execute('''
+                INSERT INTO sessions (goal, start_time, end_time, total_duration)
+                VALUES (?, ?, ?, ?)
+            ''', (
+                session.goal,
+                session.start_time,
+                session.end_time,
+                int(session.duration.total_seconds()) if session.end_time else None
+            ))
+            return cursor.lastrowid
     
-    def save_activity(self, session_id: int, activity: Activity):
-        """Save an activity to database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO activities 
-            (session_id, timestamp, title, process, url, classification, 
-             relevance_score, duration, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    @staticmethod
+    def activity_row(session_id: int, activity: Activity) -> tuple:
+        """Build the activities insert parameters for one activity"""
+        return (
             session_id,
             activity.timestamp,
             activity.title,
@@ -293,14 +433,39 @@ class FocusDatabase:
             activity.relevance_score,
             int(activity.duration.total_seconds()) if activity.duration else None,
             ','.join(activity.tags) if activity.tags else None
-        ))
-        
-        conn.commit()
-        conn.close()
+        )
+    
+    def save_activity(self, session_id: int, activity: Activity):
+        """Save an activity to database"""
+        conn = self._conn()
+        with conn:
+            conn.execute(self.ACTIVITY_INSERT, self.activity_row(session_id, activity))
+    
+    def save_activities_bulk(self, session_id: int, session: FocusSession):
+        """Save all of a session's activities in a single transaction"""
+        rows = session.activity_rows(session_id)
+        conn = self._conn()
+        with conn:
+            # Autocommit mode would otherwise commit every row separately
+            conn.execute('BEGIN')
+            conn.executemany(self.ACTIVITY_INSERT, rows)
 
 class EnhancedWindowMonitor:
     """Enhanced window monitor with time tracking and focus analysis"""
     
+    # Per-classification activity header, colored and formatted once
+    ACTIVITY_HEADER_FMT = {
+        classification: f"\n{color}[{{timestamp}}] {_CLASS_EMOJI[classification]} {classification} ({{score:.2f}}){Colors.ENDC}"
+        for classification, color in _CLASS_COLOR.items()
+    }
+    
+    # Polling fallback: react quickly after a switch, back off while idle
+    MIN_POLL_INTERVAL = 0.5
+    MAX_POLL_INTERVAL = 5.0
+    
+    # Bound on the pid -> (create_time, name) cache used by the xdotool path
+    PID_CACHE_SIZE = 256
+    
     def __init__(self, content_analyzer: ContentAnalyzer, database: FocusDatabase):
         self.content_analyzer = content_analyzer
         self.database = database
@@ -310,20 +475,44 @@ class EnhancedWindowMonitor:
         self.activity_start_time = None
         self.running = True
         
-        # Time tracking
-        self.session_stats = {
-            'DIRECT': timedelta(),
-            'PERIPHERAL': timedelta(),
-            'INDIRECT': timedelta(),
-            'DISTRACTION': timedelta()
-        }
-        
-        # Recent activities for pattern analysis
+        # Recent activities for pattern analysis, with running totals kept
+        # in step so the per-event stats don't rescan the window
         self.recent_activities = deque(maxlen=50)
+        self._running_total_s = 0.0
+        self._running_direct_s = 0.0
+        self._recent_classes = deque(maxlen=3)
+        self._recent_distractions = 0
+        self._recent_scores = deque(maxlen=5)
+        self._recent_score_sum = 0.0
         
         # Context switching tracking
         self.context_switches = 0
         self.last_classification = None
+        
+        self._dpy = None
+        self._pid_name_cache = OrderedDict()
+        # In-process frontmost-app queries on macOS instead of spawning osascript
+        self._ws = NSWorkspace.sharedWorkspace() if PYOBJC_AVAILABLE else None
+        if sys.platform.startswith('linux') and XLIB_AVAILABLE:
+            try:
+                # One persistent X connection instead of spawning xdotool per poll
+                self._dpy = Display()
+                self._root = self._dpy.screen().root
+                self._atom_active = self._dpy.intern_atom('_NET_ACTIVE_WINDOW')
+                self._atom_name = self._dpy.intern_atom('_NET_WM_NAME')
+                self._atom_pid = self._dpy.intern_atom('_NET_WM_PID')
+                self._atom_utf8 = self._dpy.intern_atom('UTF8_STRING')
+            except Exception:
+                self._dpy = None
+    
+    @property
+    def session_stats(self) -> dict:
+        """Time per classification, reduced from the session's activity columns on demand"""
+        totals = [0.0] * len(CLASSIFICATIONS)
+        if self.current_session:
+            for class_id, seconds in zip(self.current_session.class_ids, self.current_session.durations_s):
+                totals[class_id] += seconds
+        return {name: timedelta(seconds=s) for name, s in zip(CLASSIFICATIONS, totals)}
     
     def start_session(self, goal: str):
         """Start a new focus session"""
@@ -336,9 +525,15 @@ class EnhancedWindowMonitor:
         )
         
         # Reset session stats
-        self.session_stats = {k: timedelta() for k in self.session_stats}
         self.context_switches = 0
         self.recent_activities.clear()
+        self.content_analyzer.clear_caches()
+        self._running_total_s = 0.0
+        self._running_direct_s = 0.0
+        self._recent_classes.clear()
+        self._recent_distractions = 0
+        self._recent_scores.clear()
+        self._recent_score_sum = 0.0
         
         print(f"\n{Colors.HEADER}🎯 FOCUS SESSION STARTED{Colors.ENDC}")
         print(f"Goal: {Colors.BOLD}{goal}{Colors.ENDC}")
@@ -352,16 +547,16 @@ class EnhancedWindowMonitor:
         
         # Finalize current activity
         if self.current_activity and self.activity_start_time:
-            duration = datetime.now() - self.activity_start_time
-            self.current_activity.duration = duration
-            self.session_stats[self.current_activity.classification] += duration
+            self.current_activity.duration = datetime.now() - self.activity_start_time
+            self.current_session.add_activity(self.current_activity)
+        self.current_activity = None
+        self.activity_start_time = None
         
         self.current_session.end_time = datetime.now()
         
         # Save to database
         session_id = self.database.save_session(self.current_session)
-        for activity in self.current_session.activities:
-            self.database.save_activity(session_id, activity)
+        self.database.save_activities_bulk(session_id, self.current_session)
         
         # Display session summary
         self.display_session_summary()
@@ -383,32 +578,111 @@ class EnhancedWindowMonitor:
     
     def get_active_window_linux(self):
         """Linux window detection"""
+        if self._dpy is None:
+            return self.get_active_window_xdotool()
+        
         try:
-            result = subprocess.run(['xdotool', 'getactivewindow'], 
+            prop = self._root.get_full_property(self._atom_active, X.AnyPropertyType)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            window = self._dpy.create_resource_object('window', prop.value[0])
+            
+            name_prop = window.get_full_property(self._atom_name, self._atom_utf8)
+            if name_prop:
+                window_name = name_prop.value.decode('utf-8', 'replace')
+            else:
+                window_name = window.get_wm_name() or "Unknown"
+            
+            pid_prop = window.get_full_property(self._atom_pid, X.AnyPropertyType)
+            if pid_prop and pid_prop.value:
+                pid = int(pid_prop.value[0])
+                process = _psutil().Process(pid)
+                return {
+                    'title': window_name,
+                    'process': process.name(),
+                    'pid': pid
+                }
+        except Exception:
+            pass
+        return None
+    
+    def get_active_window_xdotool(self):
+        """Linux window detection via xdotool (fallback without python-xlib)"""
+        try:
+            # One chained invocation prints the active window's name and pid
+            result = subprocess.run(['xdotool', 'getactivewindow', 'getwindowname', '%1', 'getwindowpid', '%1'], 
                                   capture_output=True, text=True)
             if result.returncode == 0:
-                window_id = result.stdout.strip()
-                
-                result = subprocess.run(['xdotool', 'getwindowname', window_id], 
-                                      capture_output=True, text=True)
-                window_name = result.stdout.strip() if result.returncode == 0 else "Unknown"
+                window_name, _, pid = result.stdout.strip().rpartition('\n')
+                pid = int(pid)
                 
-                result = subprocess.run(['xdotool', 'getwindowpid', window_id], 
-                                      capture_output=True, text=True)
-                if result.returncode == 0:
-                    pid = int(result.stdout.strip())
-                    process = psutil.Process(pid)
-                    return {
-                        'title': window_name,
-                        'process': process.name(),
-                        'pid': pid
-                    }
+                process_name = self._process_name(pid)
+                return {
+                    'title': window_name or "Unknown",
+                    'process': process_name,
+                    'pid': pid
+                }
         except Exception:
             pass
         return None
     
+    def _process_name(self, pid: int) -> str:
+        """Name of a pid's process, cached until the pid is reused"""
+        psutil = _psutil()
+        try:
+            # Constructing the Process already reads its start time; a
+            # different one means the pid now belongs to another process
+            process = psutil.Process(pid)
+            created = process.create_time()
+        except psutil.NoSuchProcess:
+            self._pid_name_cache.pop(pid, None)
+            raise
+        
+        cached = self._pid_name_cache.get(pid)
+        if cached is not None and cached[0] == created:
+            self._pid_name_cache.move_to_end(pid)
+            return cached[1]
+        
+        name = process.name()
+        self._pid_name_cache[pid] = (created, name)
+        self._pid_name_cache.move_to_end(pid)
+        if len(self._pid_name_cache) > self.PID_CACHE_SIZE:
+            self._pid_name_cache.popitem(last=False)
+        return name
+    
     def get_active_window_mac(self):
         """macOS window detection"""
+        if self._ws is None:
+            return self.get_active_window_osascript()
+        
+        try:
+            app = self._ws.frontmostApplication()
+            if app is None:
+                return None
+            app_name = app.localizedName()
+            pid = app.processIdentifier()
+            
+            # Window list is ordered front to back; take the app's first normal-layer window
+            window_title = None
+            windows = CGWindowListCopyWindowInfo(
+                kCGWindowListOptionOnScreenOnly | kCGWindowListExcludeDesktopElements, kCGNullWindowID
+            )
+            for window in windows or ():
+                if window.get('kCGWindowOwnerPID') == pid and window.get('kCGWindowLayer') == 0:
+                    window_title = window.get('kCGWindowName')
+                    break
+            
+            return {
+                'title': window_title or app_name,
+                'process': app_name,
+                'pid': pid
+            }
+        except Exception:
+            pass
+        return None
+    
+    def get_active_window_osascript(self):
+        """macOS window detection via AppleScript (fallback without PyObjC)"""
         try:
             script = '''
             tell application "System Events"
@@ -444,7 +718,7 @@ class EnhancedWindowMonitor:
             hwnd = win32gui.GetForegroundWindow()
             window_title = win32gui.GetWindowText(hwnd)
             _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
+            process = _psutil().Process(pid)
             
             return {
                 'title': window_title,
@@ -466,9 +740,8 @@ class EnhancedWindowMonitor:
         if self.current_activity and self.activity_start_time:
             duration = now - self.activity_start_time
             self.current_activity.duration = duration
-            self.session_stats[self.current_activity.classification] += duration
-            self.current_session.activities.append(self.current_activity)
-            self.recent_activities.append(self.current_activity)
+            self.current_session.add_activity(self.current_activity)
+            self.remember_activity(self.current_activity)
         
         # Analyze new activity
         domain = self.content_analyzer.extract_domain(window_info['title'], window_info['process'])
@@ -502,6 +775,33 @@ class EnhancedWindowMonitor:
         # Check for alerts
         self.check_focus_alerts()
     
+    def remember_activity(self, activity: Activity):
+        """Append to the recent window, updating running totals for the evicted entry"""
+        if len(self.recent_activities) == self.recent_activities.maxlen:
+            evicted = self.recent_activities[0]
+            if evicted.duration:
+                seconds = evicted.duration.total_seconds()
+                self._running_total_s -= seconds
+                if evicted.classification == 'DIRECT':
+                    self._running_direct_s -= seconds
+        self.recent_activities.append(activity)
+        
+        if activity.duration:
+            seconds = activity.duration.total_seconds()
+            self._running_total_s += seconds
+            if activity.classification == 'DIRECT':
+                self._running_direct_s += seconds
+        
+        if len(self._recent_classes) == self._recent_classes.maxlen and self._recent_classes[0] == 'DISTRACTION':
+            self._recent_distractions -= 1
+        self._recent_classes.append(activity.classification)
+        if activity.classification == 'DISTRACTION':
+            self._recent_distractions += 1
+        if len(self._recent_scores) == self._recent_scores.maxlen:
+            self._recent_score_sum -= self._recent_scores[0]
+        self._recent_scores.append(activity.relevance_score)
+        self._recent_score_sum += activity.relevance_score
+    
     def display_current_activity(self):
         """Display current activity with focus classification"""
         if not self.current_activity:
@@ -513,31 +813,23 @@ class EnhancedWindowMonitor:
         title = self.current_activity.title[:60] + "..." if len(self.current_activity.title) > 60 else self.current_activity.title
         
         # Color coding based on classification
-        color = {
-            'DIRECT': Colors.DIRECT,
-            'PERIPHERAL': Colors.WARNING,
-            'INDIRECT': Colors.OKBLUE,
-            'DISTRACTION': Colors.FAIL
-        }.get(classification, Colors.ENDC)
-        
-        emoji = {
-            'DIRECT': '🟢',
-            'PERIPHERAL': '🟡',
-            'INDIRECT': '🟠',
-            'DISTRACTION': '🔴'
-        }.get(classification, '⚪')
-        
-        print(f"\n{color}[{timestamp}] {emoji} {classification} ({score:.2f}){Colors.ENDC}")
-        print(f"🌐 {self.current_activity.process}: \"{title}\"")
+        header_fmt = self.ACTIVITY_HEADER_FMT.get(classification)
+        if header_fmt is None:
+            header_fmt = f"\n{Colors.ENDC}[{{timestamp}}] ⚪ {classification} ({{score:.2f}}){Colors.ENDC}"
+        
+        lines = [
+            header_fmt.format(timestamp=timestamp, score=score),
+            f"🌐 {self.current_activity.process}: \"{title}\"",
+        ]
         
         # Show session progress
-        if len(self.recent_activities) > 0:
-            total_time = sum((a.duration for a in self.recent_activities if a.duration), timedelta())
-            if total_time.total_seconds() > 0:
-                focus_time = sum((a.duration for a in self.recent_activities 
-                                if a.classification == 'DIRECT' and a.duration), timedelta())
-                focus_percentage = (focus_time.total_seconds() / total_time.total_seconds()) * 100
-                print(f"📊 Session Focus: {focus_percentage:.1f}% | Switches: {self.context_switches}")
+        if self._running_total_s > 0:
+            focus_percentage = (self._running_direct_s / self._running_total_s) * 100
+            lines.append(f"📊 Session Focus: {focus_percentage:.1f}% | Switches: {self.context_switches}")
+        
+        # One write for the whole block instead of a print (and stdout lock) per line
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
     
     def check_focus_alerts(self):
         """Check for focus-related alerts"""
@@ -545,14 +837,11 @@ class EnhancedWindowMonitor:
             return
         
         # Check for topic drift
-        recent_classifications = [a.classification for a in list(self.recent_activities)[-3:]]
-        if 'DISTRACTION' in recent_classifications:
-            if recent_classifications.count('DISTRACTION') >= 2:
-                print(f"{Colors.FAIL}⚠️  FOCUS ALERT: Multiple distractions detected{Colors.ENDC}")
+        if self._recent_distractions >= 2:
+            print(f"{Colors.FAIL}⚠️  FOCUS ALERT: Multiple distractions detected{Colors.ENDC}")
         
         # Check for prolonged low relevance
-        recent_scores = [a.relevance_score for a in list(self.recent_activities)[-5:]]
-        if len(recent_scores) >= 5 and sum(recent_scores) / len(recent_scores) < 0.4:
+        if len(self._recent_scores) >= 5 and self._recent_score_sum / len(self._recent_scores) < 0.4:
             print(f"{Colors.WARNING}🤔 DRIFT DETECTED: Low relevance to goal \"{self.current_session.goal}\"{Colors.ENDC}")
         
         # Context switching alert
@@ -566,43 +855,48 @@ class EnhancedWindowMonitor:
         
         total_duration = self.current_session.duration
         
-        print(f"\n{Colors.HEADER}🧠 FOCUS SESSION SUMMARY{Colors.ENDC}")
-        print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
-        print(f"🎯 Goal: {self.current_session.goal}")
-        print(f"⏱️  Duration: {self.format_duration(total_duration)}")
-        print(f"🔄 Context Switches: {self.context_switches}")
-        
-        print(f"\n📊 RELEVANCE BREAKDOWN:")
-        print("┌─────────────────────────────────────────────┐")
+        lines = [
+            f"\n{Colors.HEADER}🧠 FOCUS SESSION SUMMARY{Colors.ENDC}",
+            f"{Colors.HEADER}{'='*60}{Colors.ENDC}",
+            f"🎯 Goal: {self.current_session.goal}",
+            f"⏱️  Duration: {self.format_duration(total_duration)}",
+            f"🔄 Context Switches: {self.context_switches}",
+            "\n📊 RELEVANCE BREAKDOWN:",
+            "┌─────────────────────────────────────────────┐",
+        ]
         
-        for classification, duration in self.session_stats.items():
+        stats = self.session_stats
+        for classification, duration in stats.items():
             if total_duration.total_seconds() > 0:
                 percentage = (duration.total_seconds() / total_duration.total_seconds()) * 100
-                emoji = {'DIRECT': '🟢', 'PERIPHERAL': '🟡', 'INDIRECT': '🟠', 'DISTRACTION': '🔴'}[classification]
+                emoji = _CLASS_EMOJI[classification]
                 
-                print(f"│ {emoji} {classification:12}: {self.format_duration(duration):>8} | {percentage:>5.1f}% │")
+                lines.append(f"│ {emoji} {classification:12}: {self.format_duration(duration):>8} | {percentage:>5.1f}% │")
         
-        print("└─────────────────────────────────────────────┘")
+        lines.append("└─────────────────────────────────────────────┘")
         
         # Focus score calculation
         if total_duration.total_seconds() > 0:
-            direct_time = self.session_stats['DIRECT'].total_seconds()
-            peripheral_time = self.session_stats['PERIPHERAL'].total_seconds()
+            direct_time = stats['DIRECT'].total_seconds()
+            peripheral_time = stats['PERIPHERAL'].total_seconds()
             total_seconds = total_duration.total_seconds()
             
             focus_score = ((direct_time * 1.0) + (peripheral_time * 0.7)) / total_seconds * 10
             focus_score = min(focus_score, 10.0)
             
-            print(f"\n🎯 FOCUS SCORE: {focus_score:.1f}/10")
+            lines.append(f"\n🎯 FOCUS SCORE: {focus_score:.1f}/10")
             
             if focus_score >= 8.0:
-                print(f"{Colors.OKGREEN}✅ EXCELLENT focus session!{Colors.ENDC}")
+                lines.append(f"{Colors.OKGREEN}✅ EXCELLENT focus session!{Colors.ENDC}")
             elif focus_score >= 6.0:
-                print(f"{Colors.WARNING}👍 GOOD focus session{Colors.ENDC}")
+                lines.append(f"{Colors.WARNING}👍 GOOD focus session{Colors.ENDC}")
             elif focus_score >= 4.0:
-                print(f"{Colors.WARNING}⚠️  FAIR - room for improvement{Colors.ENDC}")
+                lines.append(f"{Colors.WARNING}⚠️  FAIR - room for improvement{Colors.ENDC}")
             else:
-                print(f"{Colors.FAIL}❌ LOW focus - consider strategies to reduce distractions{Colors.ENDC}")
+                lines.append(f"{Colors.FAIL}❌ LOW focus - consider strategies to reduce distractions{Colors.ENDC}")
+        
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
     
     def format_duration(self, duration: timedelta) -> str:
         """Format duration as readable string"""
@@ -616,19 +910,107 @@ class EnhancedWindowMonitor:
         else:
             return f"{minutes}m {seconds:02d}s"
     
+    def handle_window(self, window_info):
+        """Process the window if it differs from the last one seen"""
+        if window_info and window_info != self.last_window_info:
+            self.last_window_info = window_info
+            self.process_window_change(window_info)
+            return True
+        return False
+    
     def start_monitoring(self):
         """Start the enhanced window monitoring loop"""
         print(f"{Colors.HEADER}🪟 Enhanced Focus Monitor Started{Colors.ENDC}")
         
+        # Prefer OS focus-change notifications; poll only where none are available
+        if self._dpy is not None:
+            self.watch_x11_events()
+        elif sys.platform.startswith('win'):
+            self.watch_win_events()
+        else:
+            self.poll_windows()
+    
+    def watch_x11_events(self):
+        """Block on X11 PropertyNotify events for focus and title changes"""
+        self._root.change_attributes(event_mask=X.PropertyChangeMask)
+        watched = None
+        
         while self.running:
             try:
-                window_info = self.get_active_window()
+                self.handle_window(self.get_active_window_linux())
                 
-                if window_info and window_info != self.last_window_info:
-                    self.last_window_info = window_info
-                    self.process_window_change(window_info)
+                # Also follow title changes (e.g. switching browser tabs) on the active window
+                prop = self._root.get_full_property(self._atom_active, X.AnyPropertyType)
+                active_id = prop.value[0] if prop and prop.value else 0
+                if active_id and active_id != watched:
+                    window = self._dpy.create_resource_object('window', active_id)
+                    window.change_attributes(event_mask=X.PropertyChangeMask)
+                    watched = active_id
+                
+                # Wait for a relevant property change, waking up periodically to honour self.running
+                changed = False
+                while self.running and not changed:
+                    if not self._dpy.pending_events():
+                        select.select([self._dpy], [], [], 1.0)
+                    while self._dpy.pending_events():
+                        event = self._dpy.next_event()
+                        if event.type == X.PropertyNotify and event.atom in (self._atom_active, self._atom_name):
+                            changed = True
+                
+            except Exception as e:
+                print(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
+                time.sleep(5)
+    
+    def watch_win_events(self):
+        """Receive foreground/title changes through SetWinEventHook"""
+        def on_event(hook, event, hwnd, id_object, id_child, thread_id, timestamp):
+            if event == EVENT_OBJECT_NAMECHANGE and (
+                    id_object != OBJID_WINDOW or hwnd != _user32.GetForegroundWindow()):
+                return
+            try:
+                self.handle_window(self.get_active_window_windows())
+            except Exception as e:
+                print(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
+        
+        # Keep a reference to the callback so it is not garbage collected while hooked
+        callback = WinEventProc(on_event)
+        hooks = [
+            _user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND,
+                                    None, callback, 0, 0, WINEVENT_OUTOFCONTEXT),
+            _user32.SetWinEventHook(EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE,
+                                    None, callback, 0, 0, WINEVENT_OUTOFCONTEXT),
+        ]
+        if not all(hooks):
+            for hook in hooks:
+                if hook:
+                    _user32.UnhookWinEvent(hook)
+            return self.poll_windows()
+        
+        try:
+            self.handle_window(self.get_active_window_windows())
+            msg = wintypes.MSG()
+            while self.running:
+                # Hook callbacks are delivered through this thread's message queue
+                _user32.MsgWaitForMultipleObjects(0, None, False, 1000, QS_ALLINPUT)
+                while _user32.PeekMessageW(ctypes.byref(msg), None, 0, 0, PM_REMOVE):
+                    _user32.TranslateMessage(ctypes.byref(msg))
+                    _user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            for hook in hooks:
+                _user32.UnhookWinEvent(hook)
+    
+    def poll_windows(self):
+        """Poll the active window, backing off while it stays unchanged"""
+        interval = self.MIN_POLL_INTERVAL
+        
+        while self.running:
+            try:
+                if self.handle_window(self.get_active_window()):
+                    interval = self.MIN_POLL_INTERVAL
+                else:
+                    interval = min(interval * 1.5, self.MAX_POLL_INTERVAL)
                 
-                time.sleep(2)  # Check every 2 seconds
+                time.sleep(interval)
                 
             except KeyboardInterrupt:
                 if self.current_session:
@@ -712,7 +1094,7 @@ class EnhancedActivityTracker:
                         for classification, duration in self.window_monitor.session_stats.items():
                             if total.total_seconds() > 0:
                                 pct = (duration.total_seconds() / total.total_seconds()) * 100
-                                emoji = {'DIRECT': '🟢', 'PERIPHERAL': '🟡', 'INDIRECT': '🟠', 'DISTRACTION': '🔴'}[classification]
+                                emoji = _CLASS_EMOJI[classification]
                                 print(f"  {emoji} {classification}: {self.window_monitor.format_duration(duration)} ({pct:.1f}%)")
                 
                 elif command == 'help':
@@ -745,9 +1127,7 @@ def main():
     # Check dependencies
     missing_deps = []
     
-    try:
-        import psutil
-    except ImportError:
+    if importlib.util.find_spec('psutil') is None:
         missing_deps.append('psutil')
     
     if missing_deps:
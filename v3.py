@@ -4,17 +4,21 @@ import time
 import sqlite3
 import threading
 import subprocess
+import tempfile
+import importlib
+import importlib.util
+from concurrent import futures
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 import re
-from collections import defaultdict, deque
+import functools
+import hashlib
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
-import hashlib
-import requests
 
-import psutil
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 
@@ -24,6 +28,25 @@ try:
 except ImportError:
     SCAPY_AVAILABLE = False
 
+try:
+    from Xlib import X
+    from Xlib.display import Display
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+WIN32_AVAILABLE = False
+if sys.platform.startswith('win'):
+    try:
+        import win32gui
+        import win32process
+        _get_fg = win32gui.GetForegroundWindow
+        _get_text = win32gui.GetWindowText
+        _get_tpid = win32process.GetWindowThreadProcessId
+        WIN32_AVAILABLE = True
+    except ImportError:
+        pass
+
 class Colors:
     HEADER = '\033[95m'
     OKBLUE = '\033[94m'
@@ -38,6 +61,133 @@ class Colors:
     INDIRECT = '\033[94m'
     DISTRACTION = '\033[91m'
 
+_MSG_HEADER = f"{Colors.BOLD}Enhanced Focus Tracker - Study Session Monitor{Colors.ENDC}\n{Colors.HEADER}{'='*60}{Colors.ENDC}"
+_MSG_MISSING_API_KEY = (f"{Colors.WARNING}Note: Set XAI_API_KEY environment variable to enable AI-powered "
+                        f"classification. Visit https://x.ai/api for details.{Colors.ENDC}")
+_MSG_PROMPT = f"\n{Colors.BOLD}>{Colors.ENDC} "
+_MSG_UNKNOWN = f"{Colors.WARNING}Unknown command. Type 'help' for available commands.{Colors.ENDC}"
+_MSG_GOODBYE = f"{Colors.OKGREEN}👋 Goodbye!{Colors.ENDC}"
+
+XAI_URL = "https://api.x.ai/v1/chat/completions"
+XAI_MODEL = "grok-beta"
+
+CLASSIFICATIONS = ('DIRECT', 'PERIPHERAL', 'INDIRECT', 'DISTRACTION')
+
+_CLASS_COLOR = {
+    'DIRECT': Colors.DIRECT,
+    'PERIPHERAL': Colors.WARNING,
+    'INDIRECT': Colors.OKBLUE,
+    'DISTRACTION': Colors.FAIL
+}
+_CLASS_EMOJI = {
+    'DIRECT': '🟢',
+    'PERIPHERAL': '🟡',
+    'INDIRECT': '🟠',
+    'DISTRACTION': '🔴'
+}
+
+_DOMAIN_RE1 = re.compile(r'- ([^-]+\.com)', re.I)
+_DOMAIN_RE2 = re.compile(r'([^|\s]+\.[a-z]{2,4})', re.I)
+_LITERAL_MAP = (
+    ('youtube', 'youtube.com'),
+    ('wikipedia', 'wikipedia.org'),
+    ('stack overflow', 'stackoverflow.com'),
+    ('github', 'github.com'),
+)
+
+@functools.lru_cache(maxsize=64)
+def _compile_matcher(keywords: Tuple[str, ...]) -> Optional[re.Pattern]:
+    # One alternation (longest first) replaces a substring test per keyword
+    alternatives = sorted({str(k).lower() for k in keywords if k}, key=len, reverse=True)
+    if not alternatives:
+        return None
+    return re.compile('|'.join(map(re.escape, alternatives)))
+
+@functools.lru_cache(maxsize=64)
+def _lowered(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tuple(str(k).lower() for k in keywords)
+
+@functools.lru_cache(maxsize=64)
+def _description_matcher(description: str) -> Optional[re.Pattern]:
+    return _compile_matcher(tuple(description.lower().split()))
+
+@functools.lru_cache(maxsize=64)
+def _goal_words(goal: str, description: str) -> Tuple[str, ...]:
+    return tuple(set(re.findall(r'\w+', goal.lower() + ' ' + description.lower())))[:50]
+
+_EDUCATIONAL_RE = _compile_matcher((
+    'lecture', 'tutorial', 'course', 'crash course', 'educational', 'introduction', 'neural', 'cnn', 'convolutional'
+))
+_PROJECT_TERMS = frozenset({'focusflow', 'daip', 'v3.py', 'activity_tracker'})
+_PROJECT_RE = _compile_matcher(tuple(sorted(_PROJECT_TERMS)))
+
+def _psutil():
+    # Imported on first use so main() can report it missing instead of crashing at import
+    return importlib.import_module('psutil')
+
+@functools.lru_cache(maxsize=256)
+def _proc_name(pid: int) -> str:
+    # Process names don't change; exceptions (e.g. NoSuchProcess) are never cached
+    return _psutil().Process(pid).name()
+
+_FRONT_WINDOW_SCRIPT = '''
+tell application "System Events"
+    set frontApp to first application process whose frontmost is true
+    set appName to name of frontApp
+    try
+        set windowTitle to name of front window of frontApp
+    on error
+        set windowTitle to appName
+    end try
+    return appName & "|" & windowTitle
+end tell
+'''
+
+@functools.lru_cache(maxsize=1)
+def _front_window_command() -> Tuple[str, ...]:
+    # Compile the AppleScript once; osascript then skips parsing it on every poll.
+    # The file name carries a hash of the source, so an edited script never runs stale
+    digest = hashlib.sha1(_FRONT_WINDOW_SCRIPT.encode()).hexdigest()[:12]
+    compiled = Path(tempfile.gettempdir()) / f"focusflow_front_window_{os.getuid()}_{digest}.scpt"
+    try:
+        if not compiled.exists():
+            # Built under a private name and renamed, so a partial file is never picked up
+            partial = compiled.with_name(f"{compiled.stem}.{os.getpid()}.scpt")
+            subprocess.run(['osacompile', '-o', str(partial), '-e', _FRONT_WINDOW_SCRIPT],
+                           capture_output=True, check=True)
+            os.replace(partial, compiled)
+        return ('osascript', str(compiled))
+    except (OSError, subprocess.CalledProcessError):
+        return ('osascript', '-e', _FRONT_WINDOW_SCRIPT)
+
+def _extract_json(content: str, open_char: str, close_char: str):
+    # Outermost bracket pair by plain find/rfind (skips code fences and chatter), parsed once
+    start = content.find(open_char)
+    end = content.rfind(close_char)
+    if start == -1 or end < start:
+        raise ValueError("No valid JSON in AI response")
+    return json.loads(content[start:end + 1])
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float = 1.0, burst: int = 10):
+        self.rate = rate_per_sec
+        self.capacity = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._cond = threading.Condition()
+    
+    def acquire(self):
+        # Block until a token is available rather than firing and eating a 429
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self._cond.wait((1 - self.tokens) / self.rate)
+
 @dataclass
 class FocusSession:
     goal: str
@@ -71,6 +221,8 @@ class Activity:
             self.tags = []
 
 class ContentAnalyzer:
+    CACHE_SIZE = 2048
+    
     def __init__(self):
         self.educational_domains = {
             'youtube.com': 0.7,
@@ -104,12 +256,45 @@ class ContentAnalyzer:
         
         self.api_key = os.getenv('XAI_API_KEY')
         self.use_ai = bool(self.api_key)
-        self.keyword_cache = {}
-        self.classification_cache = {}
-        self.ambiguous_domains = ['youtube.com', 'code', 'focusflow', 'daip', 'medium.com']
+        
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        # Keep-alive session so each xAI call reuses the TCP/TLS connection
+        self._http = requests.Session()
+        self._http.headers.update({
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        })
+        retries = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504),
+                        allowed_methods=frozenset({'POST'}), raise_on_status=False)
+        self._http.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8, max_retries=retries))
+        # 60 requests/minute with bursts of 10
+        self._rl = TokenBucket(rate_per_sec=1.0, burst=10)
+        # Bounded LRUs keyed by the argument tuples; only successful AI answers are stored
+        self.keyword_cache = OrderedDict()
+        self.classification_cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.ambiguous_domains = frozenset({'youtube.com', 'code', 'focusflow', 'daip', 'medium.com'})
     
-    def extract_domain(self, title: str, process: str) -> str:
-        title_lower = title.lower()
+    def _cache_get(self, cache: OrderedDict, key):
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache: OrderedDict, key, value):
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > self.CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    def extract_domain(self, title: str, process: str, title_lower: Optional[str] = None) -> str:
+        if title_lower is None:
+            title_lower = title.lower()
         process_lower = process.lower()
         
         if 'code' in process_lower or 'visual studio code' in title_lower:
@@ -117,148 +302,91 @@ class ContentAnalyzer:
                 return 'focusflow'
             return 'code'
         
-        browser_patterns = [
-            r'- ([^-]+\.com)',
-            r'([^|\s]+\.[a-z]{2,4})',
-            r'YouTube', 'Wikipedia', 'GitHub', 'Stack Overflow'
-        ]
-        
-        for pattern in browser_patterns:
-            match = re.search(pattern, title, re.IGNORECASE)
+        for pattern in (_DOMAIN_RE1, _DOMAIN_RE2):
+            match = pattern.search(title)
             if match:
-                return match.group(1).lower() if pattern not in ['YouTube', 'Wikipedia', 'GitHub', 'Stack Overflow'] else pattern.lower()
+                return match.group(1).lower()
         
-        if 'youtube' in title_lower:
-            return 'youtube.com'
-        elif 'wikipedia' in title_lower:
-            return 'wikipedia.org'
-        elif 'stack overflow' in title_lower:
-            return 'stackoverflow.com'
-        elif 'github' in title_lower:
-            return 'github.com'
+        for keyword, domain in _LITERAL_MAP:
+            if keyword in title_lower:
+                return domain
         
         return process_lower
     
-    def _ai_generate_keywords(self, goal: str, description: str) -> List[str]:
-        cache_key = hashlib.md5(f"{goal}_{description}".encode()).hexdigest()
-        if cache_key in self.keyword_cache:
-            return self.keyword_cache[cache_key]
-        
-        prompt = f"""Generate a comprehensive list of relevant keywords for the following study goal and description.
-Goal: {goal}
-Description: {description}
-
-Include keywords related to the core topic, its applications, related fields, interdisciplinary connections, and project-specific terms (e.g., 'focusflow', 'daip', 'v3.py' for productivity-related goals). For computer vision goals, include specific algorithms (e.g., 'alexnet', 'resnet', 'efficientnet', 'cnn', 'convolutional neural network', 'image processing'). Return only a JSON array of keywords (at least 20, max 50).
-"""
-        
-        url = "https://api.x.ai/v1/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+    def _xai_chat(self, system: str, prompt: str, max_tokens: int) -> str:
         data = {
-            "model": "grok-beta",
+            "model": XAI_MODEL,
             "messages": [
-                {"role": "system", "content": "You are a helpful assistant that generates relevant keywords."},
+                {"role": "system", "content": system},
                 {"role": "user", "content": prompt}
             ],
             "temperature": 0.2,
-            "max_tokens": 500
+            "max_tokens": max_tokens
         }
-        
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            content = response.json()['choices'][0]['message']['content']
-            match = re.search(r'\[.*\]', content, re.DOTALL)
-            if match:
-                keywords = json.loads(match.group(0))
-                if len(keywords) < 20:
-                    keywords.extend(goal.lower().split() + description.lower().split())
-                self.keyword_cache[cache_key] = keywords[:50]
-                return self.keyword_cache[cache_key]
-            else:
-                raise ValueError("No valid JSON array in AI response")
-        except Exception as e:
-            print(f"{Colors.FAIL}AI keyword generation failed: {e}. Using description words as fallback.{Colors.ENDC}")
-            words = re.findall(r'\w+', goal.lower() + ' ' + description.lower())
-            return list(set(words))[:50]
+        self._rl.acquire()
+        response = self._http.post(XAI_URL, json=data, timeout=10)
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content']
     
-    def _ai_classify(self, title: str, goal: str, description: str, domain: str) -> Tuple[float, str]:
-        cache_key = hashlib.md5(f"{title}_{goal}_{description}_{domain}".encode()).hexdigest()
-        if cache_key in self.classification_cache:
-            return self.classification_cache[cache_key]
-        
-        keywords = self._ai_generate_keywords(goal, description)
+    @staticmethod
+    def _parse_classification(result: dict) -> Tuple[float, str]:
+        classification = result['classification']
+        if classification not in CLASSIFICATIONS:
+            raise ValueError(f"Unknown classification {classification!r}")
+        return float(result['relevance_score']), classification
+    
+    def _ai_generate_keywords(self, goal: str, description: str) -> List[str]:
+        cache_key = (goal, description)
+        cached = self._cache_get(self.keyword_cache, cache_key)
+        if cached is not None:
+            return cached
         
-        prompt = f"""Analyze the relevance of the following window title to the study goal and description.
-Window Title: {title}
-Study Goal: {goal}
+        prompt = f"""Generate a comprehensive list of relevant keywords for the following study goal and description.
+Goal: {goal}
 Description: {description}
-Domain/URL: {domain}
-Relevant Keywords: {', '.join(keywords)}
 
-Determine how relevant this content is to the goal and description. Consider core concepts, applications, related fields, and project-specific activities (e.g., coding in 'focusflow' or 'daip' for productivity goals). Treat terms like 'lecture', 'tutorial', 'course', and specific algorithms (e.g., 'alexnet', 'resnet', 'cnn') as highly relevant for computer vision goals. Output only JSON:
-{{"relevance_score": float between 0.0 and 1.0,
-"classification": "DIRECT" | "PERIPHERAL" | "INDIRECT" | "DISTRACTION",
-"reason": short explanation}}
+Include keywords related to the core topic, its applications, related fields, interdisciplinary connections, and project-specific terms (e.g., 'focusflow', 'daip', 'v3.py' for productivity-related goals). For computer vision goals, include specific algorithms (e.g., 'alexnet', 'resnet', 'efficientnet', 'cnn', 'convolutional neural network', 'image processing'). Return only a JSON array of keywords (at least 20, max 50).
 """
         
-        url = "https://api.x.ai/v1/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        data = {
-            "model": "grok-beta",
-            "messages": [
-                {"role": "system", "content": "You are a helpful assistant that classifies content relevance."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.2,
-            "max_tokens": 200
-        }
-        
         try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            content = response.json()['choices'][0]['message']['content']
-            match = re.search(r'\{.*\}', content, re.DOTALL)
-            if match:
-                result = json.loads(match.group(0))
-                score = result['relevance_score']
-                classification = result['classification']
-                self.classification_cache[cache_key] = (score, classification)
-                return score, classification
-            else:
-                raise ValueError("No valid JSON in AI response")
+            content = self._xai_chat("You are a helpful assistant that generates relevant keywords.", prompt, 500)
+            keywords = _extract_json(content, '[', ']')
+            if len(keywords) < 20:
+                keywords.extend(goal.lower().split() + description.lower().split())
+            keywords = keywords[:50]
+            self._cache_put(self.keyword_cache, cache_key, keywords)
+            return keywords
         except Exception as e:
-            print(f"{Colors.FAIL}AI classification failed: {e}. Falling back to rule-based.{Colors.ENDC}")
-            return self._rule_based_classify(title, goal, description, domain, keywords)
+            print(f"{Colors.FAIL}AI keyword generation failed: {e}. Using description words as fallback.{Colors.ENDC}")
+            words = re.findall(r'\w+', goal.lower() + ' ' + description.lower())
+            keywords = list(dict.fromkeys(words))[:50]
+            # Cached too, so a failing API is not retried for every window
+            self._cache_put(self.keyword_cache, cache_key, keywords)
+            return keywords
     
-    def _rule_based_classify(self, title: str, goal: str, description: str, domain: str, keywords: List[str]) -> Tuple[float, str]:
-        title_lower = title.lower()
-        goal_lower = goal.lower()
-        description_lower = description.lower()
+    def _rule_based_classify(self, title: str, goal: str, description: str, domain: str, keywords: List[str],
+                             title_lower: Optional[str] = None) -> Tuple[float, str]:
+        if title_lower is None:
+            title_lower = title.lower()
         
         base_score = self.educational_domains.get(domain, 0.5)
         
-        project_terms = ['focusflow', 'daip', 'v3.py', 'activity_tracker']
-        if domain == 'focusflow' or any(term in title_lower for term in project_terms):
+        if domain == 'focusflow' or _PROJECT_RE.search(title_lower):
             base_score = max(base_score, 0.9)
         
         if domain in self.distraction_domains:
             base_score = min(base_score, self.distraction_domains[domain])
         
+        # Every distinct keyword contained in the title counts, including ones nested in longer keywords
         content_score = 0.0
-        for keyword in keywords:
-            if keyword.lower() in title_lower:
+        for keyword in dict.fromkeys(_lowered(tuple(keywords))):
+            if keyword in title_lower:
                 content_score += 0.2
-        if any(word in title_lower for word in description_lower.split()):
+        description_re = _description_matcher(description)
+        if description_re and description_re.search(title_lower):
             content_score += 0.3
         
-        educational_terms = ['lecture', 'tutorial', 'course', 'crash course', 'educational', 'introduction', 'neural', 'cnn', 'convolutional']
-        if domain == 'youtube.com' and any(term in title_lower for term in educational_terms):
+        if domain == 'youtube.com' and _EDUCATIONAL_RE.search(title_lower):
             content_score += 0.4
         
         final_score = min((base_score + content_score) / 2, 1.0)
@@ -274,83 +402,126 @@ Determine how relevant this content is to the goal and description. Consider cor
         
         return final_score, classification
     
-    def calculate_relevance_score(self, title: str, goal: str, description: str, domain: str) -> Tuple[float, str]:
-        if self.use_ai and domain in self.ambiguous_domains:
-            return self._ai_classify(title, goal, description, domain)
-        keywords = self._ai_generate_keywords(goal, description) if self.use_ai else re.findall(r'\w+', goal.lower() + ' ' + description.lower())
-        return self._rule_based_classify(title, goal, description, domain, list(set(keywords))[:50])
+    def classify_batch(self, items: List[Tuple[str, str]], goal: str, description: str) -> List[Tuple[float, str]]:
+        # One prompt for every uncached (title, domain) pair instead of a round trip each
+        results = [self._cache_get(self.classification_cache, (title, goal, description, domain))
+                   for title, domain in items]
+        misses = [i for i, result in enumerate(results) if result is None]
+        if not misses:
+            return results
+        
+        keywords = self._ai_generate_keywords(goal, description)
+        windows = "\n".join(f"{n}. [{items[i][1]}] {items[i][0]}" for n, i in enumerate(misses, 1))
+        prompt = f"""Analyze the relevance of each of the following window titles to the study goal and description.
+Study Goal: {goal}
+Description: {description}
+Relevant Keywords: {', '.join(keywords)}
+
+Windows (numbered, with their domain/URL in brackets):
+{windows}
+
+Determine how relevant each window is to the goal and description. Consider core concepts, applications, related fields, and project-specific activities (e.g., coding in 'focusflow' or 'daip' for productivity goals). Treat terms like 'lecture', 'tutorial', 'course', and specific algorithms (e.g., 'alexnet', 'resnet', 'cnn') as highly relevant for computer vision goals. Output only a JSON array with one object per window, in the same order:
+[{{"relevance_score": float between 0.0 and 1.0,
+"classification": "DIRECT" | "PERIPHERAL" | "INDIRECT" | "DISTRACTION"}}]
+"""
+        
+        try:
+            content = self._xai_chat("You are a helpful assistant that classifies content relevance.",
+                                     prompt, 60 * len(misses) + 50)
+            answers = _extract_json(content, '[', ']')
+            if len(answers) != len(misses):
+                raise ValueError(f"Expected {len(misses)} results, got {len(answers)}")
+            for i, answer in zip(misses, answers):
+                title, domain = items[i]
+                results[i] = self._parse_classification(answer)
+                self._cache_put(self.classification_cache, (title, goal, description, domain), results[i])
+        except Exception as e:
+            print(f"{Colors.FAIL}AI batch classification failed: {e}. Falling back to rule-based.{Colors.ENDC}")
+            for i in misses:
+                title, domain = items[i]
+                results[i] = self._rule_based_classify(title, goal, description, domain, keywords)
+        return results
+    
+    def needs_ai(self, domain: str) -> bool:
+        return self.use_ai and domain in self.ambiguous_domains
+    
+    def rule_based_score(self, title: str, goal: str, description: str, domain: str,
+                         title_lower: Optional[str] = None) -> Tuple[float, str]:
+        # Never waits on the network: goal words stand in until the AI keywords are cached
+        keywords = self._cache_get(self.keyword_cache, (goal, description)) if self.use_ai else None
+        if keywords is None:
+            keywords = _goal_words(goal, description)
+        return self._rule_based_classify(title, goal, description, domain, keywords, title_lower)
 
 class FocusDatabase:
+    ACTIVITY_INSERT = '''
+        INSERT INTO activities 
+        (session_id, timestamp, title, process, url, classification, 
+         relevance_score, duration, tags)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    SESSION_INSERT = '''
+        INSERT INTO sessions (goal, description, start_time, end_time, total_duration)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    
     def __init__(self, db_path: str = "focus_tracker.db"):
         self.db_path = db_path
+        # Long-lived autocommit connection; multi-row writes use explicit BEGIN/COMMIT
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
         self.init_database()
     
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS sessions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                goal TEXT NOT NULL,
-                description TEXT,
-                start_time TIMESTAMP NOT NULL,
-                end_time TIMESTAMP,
-                total_duration INTEGER,
-                focus_score REAL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS activities (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id INTEGER,
-                timestamp TIMESTAMP NOT NULL,
-                title TEXT NOT NULL,
-                process TEXT NOT NULL,
-                url TEXT,
-                classification TEXT NOT NULL,
-                relevance_score REAL NOT NULL,
-                duration INTEGER,
-                tags TEXT,
-                FOREIGN KEY (session_id) REFERENCES sessions (id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('PRAGMA journal_mode=WAL')
+            cursor.execute('PRAGMA synchronous=NORMAL')
+            cursor.execute('PRAGMA temp_store=MEMORY')
+            cursor.execute('PRAGMA cache_size=-65536')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    goal TEXT NOT NULL,
+                    description TEXT,
+                    start_time TIMESTAMP NOT NULL,
+                    end_time TIMESTAMP,
+                    total_duration INTEGER,
+                    focus_score REAL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS activities (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id INTEGER,
+                    timestamp TIMESTAMP NOT NULL,
+                    title TEXT NOT NULL,
+                    process TEXT NOT NULL,
+                    url TEXT,
+                    classification TEXT NOT NULL,
+                    relevance_score REAL NOT NULL,
+                    duration INTEGER,
+                    tags TEXT,
+                    FOREIGN KEY (session_id) REFERENCES sessions (id)
+                )
+            ''')
     
-    def save_session(self, session: FocusSession) -> int:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO sessions (goal, description, start_time, end_time, total_duration)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
+    @staticmethod
+    def session_row(session: FocusSession) -> tuple:
+        return (
             session.goal,
             session.description,
             session.start_time,
             session.end_time,
             int(session.duration.total_seconds()) if session.end_time else None
-        ))
-        
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return session_id
-    
-    def save_activity(self, session_id: int, activity: Activity):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO activities 
-            (session_id, timestamp, title, process, url, classification, 
-             relevance_score, duration, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+        )
+    
+    @staticmethod
+    def activity_row(session_id: int, activity: Activity) -> tuple:
+        return (
             session_id,
             activity.timestamp,
             activity.title,
@@ -360,12 +531,27 @@ class FocusDatabase:
             activity.relevance_score,
             int(activity.duration.total_seconds()) if activity.duration else None,
             ','.join(activity.tags) if activity.tags else None
-        ))
-        
-        conn.commit()
-        conn.close()
+        )
+    
+    def save_session_with_activities(self, session: FocusSession, activities: List[Activity]) -> int:
+        with self._lock:
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN')
+            try:
+                cursor.execute(self.SESSION_INSERT, self.session_row(session))
+                session_id = cursor.lastrowid
+                cursor.executemany(self.ACTIVITY_INSERT,
+                                   [self.activity_row(session_id, activity) for activity in activities])
+            except Exception:
+                cursor.execute('ROLLBACK')
+                raise
+            cursor.execute('COMMIT')
+            return session_id
 
 class EnhancedWindowMonitor:
+    AI_BATCH_SIZE = 8
+    AI_BATCH_INTERVAL = 5.0
+    
     def __init__(self, content_analyzer: ContentAnalyzer, database: FocusDatabase):
         self.content_analyzer = content_analyzer
         self.database = database
@@ -373,18 +559,45 @@ class EnhancedWindowMonitor:
         self.current_activity: Optional[Activity] = None
         self.last_window_info = None
         self.activity_start_time = None
-        self.running = True
+        # Set once at shutdown; the poll loop waits on it so it stops without finishing a sleep
+        self.stop_event = threading.Event()
         
+        # Seconds per classification, guarded by _stats_lock
         self.session_stats = {
-            'DIRECT': timedelta(),
-            'PERIPHERAL': timedelta(),
-            'INDIRECT': timedelta(),
-            'DISTRACTION': timedelta()
+            'DIRECT': 0.0,
+            'PERIPHERAL': 0.0,
+            'INDIRECT': 0.0,
+            'DISTRACTION': 0.0
         }
         
         self.recent_activities = deque(maxlen=50)
+        # Running totals over recent_activities, kept in step on append/evict
+        self._total_secs = 0.0
+        self._direct_secs = 0.0
         self.context_switches = 0
         self.last_classification = None
+        
+        # Ambiguous-domain activities get a rule-based score immediately and are
+        # re-scored by the AI in batches of up to AI_BATCH_SIZE
+        self._pending_ai = []
+        self._pending_since = None
+        self._pending_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._inflight = set()
+        self._executor = futures.ThreadPoolExecutor(max_workers=4)
+        
+        # One persistent X connection instead of forking xdotool three times per poll
+        self._xdisp = None
+        if sys.platform.startswith('linux') and XLIB_AVAILABLE:
+            try:
+                self._xdisp = Display()
+                self._xroot = self._xdisp.screen().root
+                self._atom_active = self._xdisp.intern_atom('_NET_ACTIVE_WINDOW')
+                self._atom_name = self._xdisp.intern_atom('_NET_WM_NAME')
+                self._atom_pid = self._xdisp.intern_atom('_NET_WM_PID')
+                self._atom_utf8 = self._xdisp.intern_atom('UTF8_STRING')
+            except Exception:
+                self._xdisp = None
     
     def start_session(self, goal: str, description: str):
         if self.current_session:
@@ -396,9 +609,21 @@ class EnhancedWindowMonitor:
             start_time=datetime.now()
         )
         
-        self.session_stats = {k: timedelta() for k in self.session_stats}
+        with self._stats_lock:
+            self.session_stats = dict.fromkeys(self.session_stats, 0.0)
         self.context_switches = 0
         self.recent_activities.clear()
+        self._total_secs = 0.0
+        self._direct_secs = 0.0
+        
+        if self.content_analyzer.use_ai:
+            # Keywords are fetched on the pool; the current window is re-scored once they land
+            session = self.current_session
+            future = self._executor.submit(self.content_analyzer._ai_generate_keywords, goal, description)
+            with self._pending_lock:
+                self._inflight.add(future)
+            future.add_done_callback(self._inflight.discard)
+            future.add_done_callback(lambda _: self._rescore_current(session))
         
         print(f"\n{Colors.HEADER}🎯 FOCUS SESSION STARTED{Colors.ENDC}")
         print(f"Goal: {Colors.BOLD}{goal}{Colors.ENDC}")
@@ -413,13 +638,13 @@ class EnhancedWindowMonitor:
         if self.current_activity and self.activity_start_time:
             duration = datetime.now() - self.activity_start_time
             self.current_activity.duration = duration
-            self.session_stats[self.current_activity.classification] += duration
+            with self._stats_lock:
+                self.session_stats[self.current_activity.classification] += duration.total_seconds()
         
+        self.flush_ai(wait=True)
         self.current_session.end_time = datetime.now()
         
-        session_id = self.database.save_session(self.current_session)
-        for activity in self.current_session.activities:
-            self.database.save_activity(session_id, activity)
+        self.database.save_session_with_activities(self.current_session, self.current_session.activities)
         
         self.display_session_summary()
         
@@ -438,6 +663,34 @@ class EnhancedWindowMonitor:
             return None
     
     def get_active_window_linux(self):
+        if self._xdisp is None:
+            return self.get_active_window_xdotool()
+        
+        try:
+            prop = self._xroot.get_full_property(self._atom_active, X.AnyPropertyType)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            window = self._xdisp.create_resource_object('window', prop.value[0])
+            
+            name_prop = window.get_full_property(self._atom_name, self._atom_utf8)
+            if name_prop:
+                window_name = name_prop.value.decode('utf-8', 'replace')
+            else:
+                window_name = window.get_wm_name() or "Unknown"
+            
+            pid_prop = window.get_full_property(self._atom_pid, X.AnyPropertyType)
+            if pid_prop and pid_prop.value:
+                pid = int(pid_prop.value[0])
+                return {
+                    'title': window_name,
+                    'process': _proc_name(pid),
+                    'pid': pid
+                }
+        except Exception:
+            pass
+        return None
+    
+    def get_active_window_xdotool(self):
         try:
             result = subprocess.run(['xdotool', 'getactivewindow'], 
                                   capture_output=True, text=True)
@@ -452,10 +705,9 @@ class EnhancedWindowMonitor:
                                       capture_output=True, text=True)
                 if result.returncode == 0:
                     pid = int(result.stdout.strip())
-                    process = psutil.Process(pid)
                     return {
                         'title': window_name,
-                        'process': process.name(),
+                        'process': _proc_name(pid),
                         'pid': pid
                     }
         except Exception:
@@ -464,19 +716,7 @@ class EnhancedWindowMonitor:
     
     def get_active_window_mac(self):
         try:
-            script = '''
-            tell application "System Events"
-                set frontApp to first application process whose frontmost is true
-                set appName to name of frontApp
-                try
-                    set windowTitle to name of front window of frontApp
-                on error
-                    set windowTitle to appName
-                end try
-                return appName & "|" & windowTitle
-            end tell
-            '''
-            result = subprocess.run(['osascript', '-e', script], 
+            result = subprocess.run(_front_window_command(), 
                                   capture_output=True, text=True)
             if result.returncode == 0:
                 parts = result.stdout.strip().split('|', 1)
@@ -490,18 +730,17 @@ class EnhancedWindowMonitor:
         return None
     
     def get_active_window_windows(self):
+        if not WIN32_AVAILABLE:
+            return None
+        
         try:
-            import win32gui
-            import win32process
-            
-            hwnd = win32gui.GetForegroundWindow()
-            window_title = win32gui.GetWindowText(hwnd)
-            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
+            hwnd = _get_fg()
+            window_title = _get_text(hwnd)
+            _, pid = _get_tpid(hwnd)
             
             return {
                 'title': window_title,
-                'process': process.name(),
+                'process': _proc_name(pid),
                 'pid': pid
             }
         except Exception:
@@ -516,17 +755,21 @@ class EnhancedWindowMonitor:
         
         if self.current_activity and self.activity_start_time:
             duration = now - self.activity_start_time
-            self.current_activity.duration = duration
-            self.session_stats[self.current_activity.classification] += duration
+            with self._stats_lock:
+                self.current_activity.duration = duration
+                self.session_stats[self.current_activity.classification] += duration.total_seconds()
+                self._remember(self.current_activity)
             self.current_session.activities.append(self.current_activity)
-            self.recent_activities.append(self.current_activity)
         
-        domain = self.content_analyzer.extract_domain(window_info['title'], window_info['process'])
-        relevance_score, classification = self.content_analyzer.calculate_relevance_score(
+        # Lowercased once and shared by domain extraction and scoring
+        title_lower = window_info['title'].lower()
+        domain = self.content_analyzer.extract_domain(window_info['title'], window_info['process'], title_lower)
+        relevance_score, classification = self.content_analyzer.rule_based_score(
             window_info['title'], 
             self.current_session.goal,
             self.current_session.description,
-            domain
+            domain,
+            title_lower
         )
         
         self.current_activity = Activity(
@@ -541,6 +784,9 @@ class EnhancedWindowMonitor:
         
         self.activity_start_time = now
         
+        if self.content_analyzer.needs_ai(domain):
+            self.queue_ai(self.current_activity)
+        
         if (self.last_classification and 
             self.last_classification != classification and
             classification == 'DISTRACTION'):
@@ -550,6 +796,85 @@ class EnhancedWindowMonitor:
         self.display_current_activity()
         self.check_focus_alerts()
     
+    def queue_ai(self, activity: Activity):
+        with self._pending_lock:
+            if not self._pending_ai:
+                self._pending_since = time.monotonic()
+            self._pending_ai.append(activity)
+            full = len(self._pending_ai) >= self.AI_BATCH_SIZE
+        if full:
+            self.flush_ai()
+    
+    def flush_ai(self, wait: bool = False):
+        with self._pending_lock:
+            pending, self._pending_ai = self._pending_ai, []
+        session = self.current_session
+        if pending and session:
+            # The xAI round trip runs on the pool so window monitoring keeps going
+            future = self._executor.submit(self._classify_pending, pending, session.goal, session.description)
+            with self._pending_lock:
+                self._inflight.add(future)
+            future.add_done_callback(self._inflight.discard)
+        if wait:
+            with self._pending_lock:
+                inflight = list(self._inflight)
+            futures.wait(inflight)
+    
+    def _classify_pending(self, pending: List[Activity], goal: str, description: str):
+        try:
+            results = self.content_analyzer.classify_batch(
+                [(activity.title, activity.url) for activity in pending],
+                goal,
+                description
+            )
+            for activity, result in zip(pending, results):
+                self._apply_classification(activity, result)
+        except Exception as e:
+            print(f"{Colors.FAIL}AI classification worker error: {e}{Colors.ENDC}")
+    
+    def _rescore_current(self, session: FocusSession):
+        activity = self.current_activity
+        # Ambiguous domains get their verdict from the AI batch instead
+        if session is not self.current_session or activity is None or self.content_analyzer.needs_ai(activity.url):
+            return
+        result = self.content_analyzer.rule_based_score(activity.title, session.goal, session.description, activity.url)
+        self._apply_classification(activity, result)
+    
+    def _apply_classification(self, activity: Activity, result: Tuple[float, str]):
+        score, classification = result
+        with self._stats_lock:
+            previous = activity.classification
+            activity.relevance_score = score
+            activity.classification = classification
+            # Already finalized: move its time to the new bucket
+            if activity.duration and previous != classification:
+                seconds = activity.duration.total_seconds()
+                self.session_stats[previous] -= seconds
+                self.session_stats[classification] += seconds
+                if ((previous == 'DIRECT') != (classification == 'DIRECT') and
+                        any(a is activity for a in self.recent_activities)):
+                    self._direct_secs += seconds if classification == 'DIRECT' else -seconds
+        
+        if previous != classification:
+            title = activity.title[:50] + "..." if len(activity.title) > 50 else activity.title
+            print(f"{Colors.OKCYAN}🤖 AI reclassified \"{title}\": {previous} → {classification} ({score:.2f}){Colors.ENDC}")
+    
+    def _remember(self, activity: Activity):
+        # Caller holds _stats_lock
+        if len(self.recent_activities) == self.recent_activities.maxlen:
+            evicted = self.recent_activities[0]
+            if evicted.duration:
+                seconds = evicted.duration.total_seconds()
+                self._total_secs -= seconds
+                if evicted.classification == 'DIRECT':
+                    self._direct_secs -= seconds
+        self.recent_activities.append(activity)
+        if activity.duration:
+            seconds = activity.duration.total_seconds()
+            self._total_secs += seconds
+            if activity.classification == 'DIRECT':
+                self._direct_secs += seconds
+    
     def display_current_activity(self):
         if not self.current_activity:
             return
@@ -559,40 +884,26 @@ class EnhancedWindowMonitor:
         score = self.current_activity.relevance_score
         title = self.current_activity.title[:60] + "..." if len(self.current_activity.title) > 60 else self.current_activity.title
         
-        color = {
-            'DIRECT': Colors.DIRECT,
-            'PERIPHERAL': Colors.WARNING,
-            'INDIRECT': Colors.OKBLUE,
-            'DISTRACTION': Colors.FAIL
-        }.get(classification, Colors.ENDC)
-        
-        emoji = {
-            'DIRECT': '🟢',
-            'PERIPHERAL': '🟡',
-            'INDIRECT': '🟠',
-            'DISTRACTION': '🔴'
-        }.get(classification, '⚪')
+        color = _CLASS_COLOR.get(classification, Colors.ENDC)
+        emoji = _CLASS_EMOJI.get(classification, '⚪')
         
         print(f"\n{color}[{timestamp}] {emoji} {classification} ({score:.2f}){Colors.ENDC}")
         print(f"🌐 {self.current_activity.process}: \"{title}\"")
         
-        if len(self.recent_activities) > 0:
-            total_time = sum((a.duration for a in self.recent_activities if a.duration), timedelta())
-            if total_time.total_seconds() > 0:
-                focus_time = sum((a.duration for a in self.recent_activities 
-                                if a.classification == 'DIRECT' and a.duration), timedelta())
-                focus_percentage = (focus_time.total_seconds() / total_time.total_seconds()) * 100
-                print(f"📊 Session Focus: {focus_percentage:.1f}% | Switches: {self.context_switches}")
+        if self._total_secs > 0:
+            focus_percentage = (self._direct_secs / self._total_secs) * 100
+            print(f"📊 Session Focus: {focus_percentage:.1f}% | Switches: {self.context_switches}")
     
     def check_focus_alerts(self):
         if not self.current_activity or len(self.recent_activities) < 5:
             return
         
-        recent_classifications = [a.classification for a in list(self.recent_activities)[-5:]]
+        count = len(self.recent_activities)
+        recent_classifications = [a.classification for a in islice(self.recent_activities, max(0, count - 5), count)]
         if recent_classifications.count('DISTRACTION') >= 3:
             print(f"{Colors.FAIL}⚠️  FOCUS ALERT: Multiple distractions detected{Colors.ENDC}")
         
-        recent_scores = [a.relevance_score for a in list(self.recent_activities)[-7:]]
+        recent_scores = [a.relevance_score for a in islice(self.recent_activities, max(0, count - 7), count)]
         if len(recent_scores) >= 7 and sum(recent_scores) / len(recent_scores) < 0.5:
             print(f"{Colors.WARNING}🤔 DRIFT DETECTED: Low relevance to goal \"{self.current_session.goal}\"{Colors.ENDC}")
         
@@ -603,30 +914,31 @@ class EnhancedWindowMonitor:
         if not self.current_session:
             return
         
-        total_duration = self.current_session.duration
+        total_seconds = self.current_session.duration.total_seconds()
+        with self._stats_lock:
+            stats = dict(self.session_stats)
         
         print(f"\n{Colors.HEADER}🧠 FOCUS SESSION SUMMARY{Colors.ENDC}")
         print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
         print(f"🎯 Goal: {self.current_session.goal}")
         print(f"📝 Description: {self.current_session.description}")
-        print(f"⏱️  Duration: {self.format_duration(total_duration)}")
+        print(f"⏱️  Duration: {self.format_duration(total_seconds)}")
         print(f"🔄 Context Switches: {self.context_switches}")
         
         print(f"\n📊 RELEVANCE BREAKDOWN:")
         print("┌─────────────────────────────────────────────┐")
         
-        for classification, duration in self.session_stats.items():
-            if total_duration.total_seconds() > 0:
-                percentage = (duration.total_seconds() / total_duration.total_seconds()) * 100
-                emoji = {'DIRECT': '🟢', 'PERIPHERAL': '🟡', 'INDIRECT': '🟠', 'DISTRACTION': '🔴'}[classification]
-                print(f"│ {emoji} {classification:12}: {self.format_duration(duration):>8} | {percentage:>5.1f}% │")
+        for classification, seconds in stats.items():
+            if total_seconds > 0:
+                percentage = (seconds / total_seconds) * 100
+                emoji = _CLASS_EMOJI[classification]
+                print(f"│ {emoji} {classification:12}: {self.format_duration(seconds):>8} | {percentage:>5.1f}% │")
         
         print("└─────────────────────────────────────────────┘")
         
-        if total_duration.total_seconds() > 0:
-            direct_time = self.session_stats['DIRECT'].total_seconds()
-            peripheral_time = self.session_stats['PERIPHERAL'].total_seconds()
-            total_seconds = total_duration.total_seconds()
+        if total_seconds > 0:
+            direct_time = stats['DIRECT']
+            peripheral_time = stats['PERIPHERAL']
             
             focus_score = ((direct_time * 1.0) + (peripheral_time * 0.7)) / total_seconds * 10
             focus_score = min(focus_score, 10.0)
@@ -642,8 +954,8 @@ class EnhancedWindowMonitor:
             else:
                 print(f"{Colors.FAIL}❌ LOW focus - consider strategies to reduce distractions{Colors.ENDC}")
     
-    def format_duration(self, duration: timedelta) -> str:
-        total_seconds = int(duration.total_seconds())
+    def format_duration(self, seconds: float) -> str:
+        total_seconds = int(seconds)
         hours = total_seconds // 3600
         minutes = (total_seconds % 3600) // 60
         seconds = total_seconds % 60
@@ -655,27 +967,57 @@ class EnhancedWindowMonitor:
     
     def start_monitoring(self):
         print(f"{Colors.HEADER}🪟 Enhanced Focus Monitor Started{Colors.ENDC}")
-        while self.running:
+        # Loop-invariant lookups bound once; this runs for the whole session
+        get_window = self.get_active_window
+        process_change = self.process_window_change
+        flush_ai = self.flush_ai
+        batch_interval = self.AI_BATCH_INTERVAL
+        monotonic = time.monotonic
+        stopped = self.stop_event.is_set
+        wait = self.stop_event.wait
+        idle_rounds = 0
+        while not stopped():
             try:
-                window_info = self.get_active_window()
+                window_info = get_window()
+                # Poll every second right after a switch, backing off to 10s while focus is stable
                 if window_info and window_info != self.last_window_info:
                     self.last_window_info = window_info
-                    self.process_window_change(window_info)
-                time.sleep(2)
+                    process_change(window_info)
+                    idle_rounds = 0
+                    delay = 1.0
+                else:
+                    idle_rounds += 1
+                    delay = min(10.0, 1.5 ** idle_rounds)
+                if self._pending_ai:
+                    if monotonic() - self._pending_since >= batch_interval:
+                        flush_ai()
+                    else:
+                        delay = min(delay, batch_interval)
+                wait(delay)
             except KeyboardInterrupt:
                 if self.current_session:
                     self.end_session()
                 break
             except Exception as e:
                 print(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
-                time.sleep(5)
+                wait(5)
 
 class EnhancedActivityTracker:
     def __init__(self):
         self.database = FocusDatabase()
         self.content_analyzer = ContentAnalyzer()
         self.window_monitor = EnhancedWindowMonitor(self.content_analyzer, self.database)
-        self.running = True
+        # One stop flag shared with the monitor thread
+        self._stop = self.window_monitor.stop_event
+        self._dispatch = {
+            'start': self.interactive_session_start,
+            'stop': self._cmd_stop,
+            'status': self._cmd_status,
+            'stats': self._cmd_stats,
+            'help': self.show_commands,
+            'quit': self._cmd_quit,
+            'exit': self._cmd_quit,
+        }
     
     def interactive_session_start(self):
         print(f"\n{Colors.BOLD}🎯 Focus Session Setup{Colors.ENDC}")
@@ -715,78 +1057,67 @@ class EnhancedActivityTracker:
         monitor_thread = threading.Thread(target=self.window_monitor.start_monitoring, daemon=True)
         monitor_thread.start()
         
-        while self.running:
+        while not self._stop.is_set():
             try:
-                command = input(f"\n{Colors.BOLD}>{Colors.ENDC} ").strip().lower()
-                
-                if command == 'start':
-                    self.interactive_session_start()
-                
-                elif command == 'stop':
-                    if self.window_monitor.current_session:
-                        self.window_monitor.end_session()
-                        print(f"{Colors.OKGREEN}✅ Session ended{Colors.ENDC}")
-                    else:
-                        print(f"{Colors.WARNING}No active session to end{Colors.ENDC}")
-                
-                elif command == 'status':
-                    if self.window_monitor.current_session:
-                        session = self.window_monitor.current_session
-                        duration = session.duration
-                        print(f"\n🎯 Active Session: {session.goal}")
-                        print(f"📝 Description: {session.description}")
-                        print(f"⏱️  Duration: {self.window_monitor.format_duration(duration)}")
-                        print(f"🔄 Context Switches: {self.window_monitor.context_switches}")
-                    else:
-                        print(f"{Colors.WARNING}No active session{Colors.ENDC}")
-                
-                elif command == 'stats':
-                    if self.window_monitor.current_session:
-                        total = self.window_monitor.current_session.duration
-                        print(f"\n📊 Current Session Stats:")
-                        for classification, duration in self.window_monitor.session_stats.items():
-                            if total.total_seconds() > 0:
-                                pct = (duration.total_seconds() / total.total_seconds()) * 100
-                                emoji = {'DIRECT': '🟢', 'PERIPHERAL': '🟡', 'INDIRECT': '🟠', 'DISTRACTION': '🔴'}[classification]
-                                print(f"  {emoji} {classification}: {self.window_monitor.format_duration(duration)} ({pct:.1f}%)")
-                
-                elif command == 'help':
-                    self.show_commands()
-                
-                elif command in ['quit', 'exit']:
-                    if self.window_monitor.current_session:
-                        self.window_monitor.end_session()
-                    self.running = False
-                    self.window_monitor.running = False
-                    print(f"{Colors.OKGREEN}👋 Goodbye!{Colors.ENDC}")
-                
+                # Interned to match the literal dispatch keys by identity
+                command = sys.intern(input(_MSG_PROMPT).strip().casefold())
+                handler = self._dispatch.get(command)
+                if handler is not None:
+                    handler()
                 else:
-                    print(f"{Colors.WARNING}Unknown command. Type 'help' for available commands.{Colors.ENDC}")
+                    print(_MSG_UNKNOWN)
                     
-            except KeyboardInterrupt:
-                if self.window_monitor.current_session:
-                    self.window_monitor.end_session()
-                self.running = False
-                self.window_monitor.running = False
-                break
-            except EOFError:
+            except (KeyboardInterrupt, EOFError):
+                self._shutdown()
                 break
-
-def main():
-    print(f"{Colors.BOLD}Enhanced Focus Tracker - Study Session Monitor{Colors.ENDC}")
-    print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
     
-    missing_deps = []
+    def _shutdown(self):
+        if self.window_monitor.current_session:
+            self.window_monitor.end_session()
+        self._stop.set()
     
-    try:
-        import psutil
-    except ImportError:
-        missing_deps.append('psutil')
+    def _cmd_stop(self):
+        if self.window_monitor.current_session:
+            self.window_monitor.end_session()
+            print(f"{Colors.OKGREEN}✅ Session ended{Colors.ENDC}")
+        else:
+            print(f"{Colors.WARNING}No active session to end{Colors.ENDC}")
     
-    try:
-        import requests
-    except ImportError:
-        missing_deps.append('requests')
+    def _cmd_status(self):
+        if self.window_monitor.current_session:
+            session = self.window_monitor.current_session
+            print(f"\n🎯 Active Session: {session.goal}")
+            print(f"📝 Description: {session.description}")
+            print(f"⏱️  Duration: {self.window_monitor.format_duration(session.duration.total_seconds())}")
+            print(f"🔄 Context Switches: {self.window_monitor.context_switches}")
+        else:
+            print(f"{Colors.WARNING}No active session{Colors.ENDC}")
+    
+    def _cmd_stats(self):
+        if self.window_monitor.current_session:
+            total = self.window_monitor.current_session.duration.total_seconds()
+            lines = ["\n📊 Current Session Stats:"]
+            if total > 0:
+                inv_total = 100.0 / total
+                format_duration = self.window_monitor.format_duration
+                with self.window_monitor._stats_lock:
+                    stats = list(self.window_monitor.session_stats.items())
+                for classification, seconds in stats:
+                    emoji = _CLASS_EMOJI.get(classification, '⚪')
+                    lines.append(f"  {emoji} {classification}: {format_duration(seconds)} ({seconds * inv_total:.1f}%)")
+            # One write so monitor-thread output can't interleave with the block
+            sys.stdout.write('\n'.join(lines) + '\n')
+            sys.stdout.flush()
+    
+    def _cmd_quit(self):
+        self._shutdown()
+        print(_MSG_GOODBYE)
+
+def main():
+    print(_MSG_HEADER)
+    
+    # Presence check only; the modules are imported where they're used
+    missing_deps = [name for name in ('psutil', 'requests') if importlib.util.find_spec(name) is None]
     
     if missing_deps:
         print(f"{Colors.FAIL}Missing dependencies: {', '.join(missing_deps)}{Colors.ENDC}")
@@ -794,7 +1125,7 @@ def main():
         return
     
     if not os.getenv('XAI_API_KEY'):
-        print(f"{Colors.WARNING}Note: Set XAI_API_KEY environment variable to enable AI-powered classification. Visit https://x.ai/api for details.{Colors.ENDC}")
+        print(_MSG_MISSING_API_KEY)
     
     tracker = EnhancedActivityTracker()
     tracker.run_interactive()
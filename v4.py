@@ -3,27 +3,43 @@ import sys
 import time
 import sqlite3
 import threading
+import queue
 import subprocess
+import importlib
+import importlib.util
+from concurrent import futures
 from datetime import datetime, timedelta
 from pathlib import Path
 import json
 import re
-from collections import defaultdict, deque
+import functools
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
-import hashlib
-import requests
 
-import psutil
-from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
+try:
+    from Xlib import X
+    from Xlib.display import Display
+    XLIB_AVAILABLE = True
+except ImportError:
+    XLIB_AVAILABLE = False
+
+try:
+    from AppKit import NSWorkspace
+    from Quartz import (
+        CGWindowListCopyWindowInfo, kCGWindowListOptionOnScreenOnly,
+        kCGWindowListExcludeDesktopElements, kCGNullWindowID
+    )
+    PYOBJC_AVAILABLE = True
+except ImportError:
+    PYOBJC_AVAILABLE = False
 
 try:
-    from scapy.all import sniff, IP, TCP
-    SCAPY_AVAILABLE = True
+    import orjson
+    ORJSON_AVAILABLE = True
 except ImportError:
-    SCAPY_AVAILABLE = False
-    print("Warning: Scapy not available. Network monitoring disabled.")
+    ORJSON_AVAILABLE = False
 
 class Colors:
     """Terminal colors for better output formatting"""
@@ -40,6 +56,101 @@ class Colors:
     INDIRECT = '\033[94m'
     DISTRACTION = '\033[91m'
 
+# Ollama bodies are parsed straight from bytes; orjson when installed, else the stdlib
+if ORJSON_AVAILABLE:
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+else:
+    _json_loads = json.loads
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode('utf-8')
+
+def _psutil():
+    # Imported on first use so main() can report it missing instead of crashing at import
+    return importlib.import_module('psutil')
+
+def _write(text: str):
+    # One write and flush per block, so monitor-thread output can't interleave with it
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+# Activity timing runs on this clock; wall-clock datetimes are only derived for display and saves
+_now = time.monotonic
+
+OLLAMA_HOST = "http://localhost:11434"
+# Generation on a local model can take a while; the status ping uses its own short timeout
+OLLAMA_TIMEOUT = 120
+# LLM keywords and verdicts carried over between runs
+LLM_CACHE_PATH = Path.home() / '.focusflow' / 'classify.json'
+
+CLASSIFICATIONS = ('DIRECT', 'PERIPHERAL', 'INDIRECT', 'DISTRACTION')
+
+# Bound once for the f-strings built on every window change
+_ENDC = Colors.ENDC
+_WARNING = Colors.WARNING
+
+_CLASS_COLOR = {
+    'DIRECT': Colors.DIRECT,
+    'PERIPHERAL': Colors.WARNING,
+    'INDIRECT': Colors.OKBLUE,
+    'DISTRACTION': Colors.FAIL
+}
+_CLASS_EMOJI = {
+    'DIRECT': '🟢',
+    'PERIPHERAL': '🟡',
+    'INDIRECT': '🟠',
+    'DISTRACTION': '🔴'
+}
+_CLASS_SCORE = {
+    'DIRECT': 0.9,
+    'PERIPHERAL': 0.7,
+    'INDIRECT': 0.4,
+    'DISTRACTION': 0.1
+}
+_RULE = f"{Colors.HEADER}{'='*60}{Colors.ENDC}"
+_BOX_TOP = "┌─────────────────────────────────────────────┐"
+_BOX_BOTTOM = "└─────────────────────────────────────────────┘"
+
+_MSG_HEADER = f"{Colors.BOLD}Enhanced Focus Tracker - Study Session Monitor{Colors.ENDC}\n{_RULE}"
+_MSG_BANNER = (f"{Colors.BOLD}🚀 Enhanced Focus Tracker{Colors.ENDC}\n{Colors.HEADER}{'='*50}{Colors.ENDC}\n"
+               f"{Colors.WARNING}Ensure Ollama is running and a model (e.g., mistral) is pulled.{Colors.ENDC}\n"
+               f"{Colors.OKCYAN}Run 'ollama list' to check available models.{Colors.ENDC}")
+_MSG_PROMPT = f"\n{Colors.BOLD}>{Colors.ENDC} "
+_MSG_UNKNOWN = f"{Colors.WARNING}Unknown command. Type 'help' for available commands.{Colors.ENDC}"
+_MSG_GOODBYE = f"{Colors.OKGREEN}👋 Goodbye!{Colors.ENDC}"
+_MSG_DISTRACTION_ALERT = f"{Colors.FAIL}⚠️  FOCUS ALERT: Multiple distractions detected{Colors.ENDC}"
+_MSG_COMMANDS = (f"\n{Colors.HEADER}📋 Available Commands:{Colors.ENDC}\n"
+                 f"  {Colors.OKCYAN}start{Colors.ENDC}  - Start a new focus session\n"
+                 f"  {Colors.OKCYAN}stop{Colors.ENDC}   - End current session\n"
+                 f"  {Colors.OKCYAN}status{Colors.ENDC} - Show current session status\n"
+                 f"  {Colors.OKCYAN}stats{Colors.ENDC}  - Show session statistics\n"
+                 f"  {Colors.OKCYAN}help{Colors.ENDC}   - Show this help\n"
+                 f"  {Colors.OKCYAN}quit{Colors.ENDC}   - Exit the tracker\n")
+
+_DOMAIN_RE1 = re.compile(r'- ([^-]+\.com)')
+_DOMAIN_RE2 = re.compile(r'([^|\s]+\.[a-z]{2,4})')
+_LITERAL_MAP = (
+    ('youtube', 'youtube.com'),
+    ('wikipedia', 'wikipedia.org'),
+    ('stack overflow', 'stackoverflow.com'),
+    ('github', 'github.com'),
+)
+_JSON_ARR_RE = re.compile(r'\[.*\]', re.DOTALL)
+_JSON_OBJ_RE = re.compile(r'\{.*\}', re.DOTALL)
+# Closing bracket of the object's last array; inner {"i": ...} objects end earlier
+_JSON_OBJ_END_RE = re.compile(r'\]\s*\}')
+_WORD_RE = re.compile(r'\w+')
+
+_PROJECT_TERMS = ('focusflow', 'daip', 'v3.py', 'activity_tracker')
+_DISTRACTION_DOMAINS = frozenset({
+    'facebook.com', 'twitter.com', 'instagram.com', 'tiktok.com', 'reddit.com', 'netflix.com', 'twitch.tv'
+})
+
+@functools.lru_cache(maxsize=64)
+def _goal_words(goal: str, description: str) -> Tuple[str, ...]:
+    """Lowercased words of the goal and description, the keyword fallback."""
+    return tuple(_WORD_RE.findall(goal.lower() + ' ' + description.lower()))
+
 @dataclass
 class FocusSession:
     """Represents a single focus session with a specific goal."""
@@ -67,7 +178,7 @@ class Activity:
     url: Optional[str] = None
     classification: str = "UNKNOWN"
     relevance_score: float = 0.0
-    duration: Optional[timedelta] = None
+    duration: Optional[float] = None  # seconds
     tags: List[str] = None
     
     def __post_init__(self):
@@ -76,19 +187,109 @@ class Activity:
 
 class ContentAnalyzer:
     """Analyzes content and classifies its relevance using a local LLM or rule-based fallback."""
+    CACHE_SIZE = 2048
+    # Bump when the cached keyword/verdict format or the prompts change
+    CACHE_VERSION = 1
+    # An app/domain pair the LLM judged recently reuses that verdict for SOURCE_TTL seconds
+    SOURCE_TTL = 60.0
+    SOURCE_MAX_AGE = 300.0
+    
     def __init__(self, model_name: str = 'mistral'):
         self.model_name = model_name
-        self.local_llm_url = "http://localhost:11434/api/generate"
+        self.local_llm_url = f"{OLLAMA_HOST}/api/generate"
         
-        self.keyword_cache = {}
-        self.classification_cache = {}
+        # Imported here rather than at module load; main() only checks that it's installed
+        import requests
+        from requests.adapters import HTTPAdapter
+        
+        # Keep-alive session so each Ollama call reuses the same local connection
+        self._http = requests.Session()
+        self._http.headers.update({'Connection': 'keep-alive', 'Accept-Encoding': 'gzip, deflate'})
+        self._http.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=0))
+        self._request_error = requests.exceptions.RequestException
+        
+        # Bounded LRUs keyed by the argument tuples; only successful LLM answers are stored
+        self.keyword_cache = OrderedDict()
+        self.classification_cache = OrderedDict()
+        self._source_cache = {}
+        self._source_swept = _now()
+        self._cache_lock = threading.Lock()
+    
+    def _cache_get(self, cache: OrderedDict, key):
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache: OrderedDict, key, value):
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            if len(cache) > self.CACHE_SIZE:
+                cache.popitem(last=False)
+    
+    def load_cache(self, path: Path):
+        """Restores keywords and verdicts saved by an earlier run with the same model."""
+        try:
+            data = _json_loads(path.read_bytes())
+        except (OSError, ValueError):
+            return
+        if data.get('version') != self.CACHE_VERSION or data.get('model') != self.model_name:
+            return
+        for key, keywords in data.get('keywords', []):
+            self._cache_put(self.keyword_cache, tuple(key), keywords)
+        for key, (score, classification) in data.get('classifications', []):
+            if classification in CLASSIFICATIONS:
+                self._cache_put(self.classification_cache, tuple(key), (score, classification))
+    
+    def save_cache(self, path: Path):
+        """Writes the keyword and verdict caches to path, replacing it atomically."""
+        with self._cache_lock:
+            data = {
+                'version': self.CACHE_VERSION,
+                'model': self.model_name,
+                'keywords': [[list(key), keywords] for key, keywords in self.keyword_cache.items()],
+                'classifications': [[list(key), list(result)] for key, result in self.classification_cache.items()],
+            }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_bytes(_json_dumps(data))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"{Colors.WARNING}Could not save the LLM cache to {path}: {e}{Colors.ENDC}")
+    
+    def recent_source_result(self, process: str, domain: str, goal: str, description: str) -> Optional[Tuple[float, str]]:
+        """Returns the LLM verdict for this app and domain if one was made within SOURCE_TTL."""
+        with self._cache_lock:
+            entry = self._source_cache.get((process, domain, goal, description))
+        if entry is None or _now() - entry[2] > self.SOURCE_TTL:
+            return None
+        return entry[0], entry[1]
+    
+    def _remember_source(self, process: str, domain: str, goal: str, description: str, result: Tuple[float, str]):
+        now = _now()
+        with self._cache_lock:
+            self._source_cache[(process, domain, goal, description)] = (result[0], result[1], now)
+            # Lazy sweep so pairs that are never revisited don't pile up; past CACHE_SIZE
+            # only verdicts still inside SOURCE_TTL, the ones lookups can return, are kept
+            if len(self._source_cache) > self.CACHE_SIZE:
+                max_age = self.SOURCE_TTL
+            elif now - self._source_swept > self.SOURCE_MAX_AGE:
+                max_age = self.SOURCE_MAX_AGE
+            else:
+                return
+            self._source_cache = {key: entry for key, entry in self._source_cache.items()
+                                  if now - entry[2] <= max_age}
+            self._source_swept = now
     
     def _check_ollama_status(self) -> bool:
         """Pings the local Ollama server to check if it's running."""
         try:
-            requests.get("http://localhost:11434", timeout=3)
+            self._http.get(OLLAMA_HOST, timeout=3)
             return True
-        except requests.exceptions.RequestException:
+        except self._request_error:
             return False
 
     def extract_domain(self, title: str, process: str) -> str:
@@ -99,140 +300,138 @@ class ContentAnalyzer:
         if 'code' in process_lower or 'visual studio code' in title_lower:
             return 'code'
         
-        browser_patterns = [
-            r'- ([^-]+\.com)',
-            r'([^|\s]+\.[a-z]{2,4})',
-        ]
-        
-        for pattern in browser_patterns:
-            match = re.search(pattern, title_lower)
+        for pattern in (_DOMAIN_RE1, _DOMAIN_RE2):
+            match = pattern.search(title_lower)
             if match:
-                return match.group(1).lower()
+                return match.group(1)
         
-        predefined_domains = {
-            'youtube': 'youtube.com', 'wikipedia': 'wikipedia.org',
-            'stack overflow': 'stackoverflow.com', 'github': 'github.com',
-        }
-        for name, domain in predefined_domains.items():
+        for name, domain in _LITERAL_MAP:
             if name in title_lower:
                 return domain
         
         return process_lower
     
-    def _llm_generate_keywords(self, goal: str, description: str) -> List[str]:
-        """Generates relevant keywords using a local LLM."""
-        cache_key = hashlib.md5(f"{goal}_{description}".encode()).hexdigest()
-        if cache_key in self.keyword_cache:
-            return self.keyword_cache[cache_key]
-        
-        prompt = f"""Generate a comprehensive list of relevant keywords for the following study goal and description.
-Goal: {goal}
-Description: {description}
-Return only a JSON array of keywords (at least 20, max 50).
-"""
+    def _ollama_generate(self, prompt: str, num_predict: int, until: Optional[re.Pattern] = None) -> str:
+        """Streams a completion and returns its text, stopping early once ``until`` matches it."""
         data = {
             "model": self.model_name,
             "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.2, "num_predict": 500}
+            "stream": True,
+            "options": {"temperature": 0.2, "num_predict": num_predict}
         }
-        
-        try:
-            response = requests.post(self.local_llm_url, json=data)
+        text = ""
+        # Closing the response on an early stop also ends generation on the server
+        with self._http.post(self.local_llm_url, data=_json_dumps(data), headers={'Content-Type': 'application/json'},
+                             stream=True, timeout=OLLAMA_TIMEOUT) as response:
             response.raise_for_status()
-            content = response.json()['response']
-            match = re.search(r'\[.*\]', content, re.DOTALL)
-            if match:
-                keywords = json.loads(match.group(0))
-                if len(keywords) < 20:
-                    keywords.extend(goal.lower().split() + description.lower().split())
-                self.keyword_cache[cache_key] = keywords[:50]
-                return self.keyword_cache[cache_key]
-            else:
-                raise ValueError("No valid JSON array in LLM response")
-        except Exception as e:
-            print(f"{Colors.FAIL}LLM keyword generation failed: {e}. Using description words as fallback.{Colors.ENDC}")
-            words = re.findall(r'\w+', goal.lower() + ' ' + description.lower())
-            return list(set(words))[:50]
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                chunk = _json_loads(line)
+                text += chunk.get('response', '')
+                if chunk.get('done') or (until is not None and until.search(text)):
+                    break
+        return text
     
-    def _llm_classify(self, title: str, goal: str, description: str, domain: str) -> Tuple[float, str]:
-        """Classifies content relevance using a local LLM."""
-        cache_key = hashlib.md5(f"{title}_{goal}_{description}_{domain}".encode()).hexdigest()
-        if cache_key in self.classification_cache:
-            return self.classification_cache[cache_key]
-        
-        keywords = self._llm_generate_keywords(goal, description)
-        
-        prompt = f"""Analyze the relevance of the following window title to the study goal and description.
-Window Title: {title}
-Study Goal: {goal}
-Description: {description}
-Domain/URL: {domain}
-Relevant Keywords: {', '.join(keywords)}
-
-Based on this information, classify the activity into one of the following categories:
+    def _store_keywords(self, raw: list, goal: str, description: str) -> List[str]:
+        # Lowercased once here so the rule-based scorer can match them as-is
+        keywords = [str(keyword).lower() for keyword in raw]
+        if len(keywords) < 20:
+            keywords.extend(goal.lower().split() + description.lower().split())
+        keywords = keywords[:50]
+        self._cache_put(self.keyword_cache, (goal, description), keywords)
+        return keywords
+    
+    def _llm_classify_batch(self, items: List[Tuple[str, str, str]], goal: str, description: str) -> List[Tuple[float, str]]:
+        """Classifies several (title, domain, process) windows with one LLM request."""
+        cache_keys = [(title, goal, description, domain) for title, domain, _ in items]
+        results = [self._cache_get(self.classification_cache, key) for key in cache_keys]
+        misses = [i for i, result in enumerate(results) if result is None]
+        for i, result in enumerate(results):
+            if result is not None:
+                self._remember_source(items[i][2], items[i][1], goal, description, result)
+        if not misses:
+            return results
+        
+        keywords = self._cache_get(self.keyword_cache, (goal, description))
+        windows = "\n".join(f"{n}. [{items[i][1]}] {items[i][0]}" for n, i in enumerate(misses))
+        categories = """Classify each window into one of the following categories:
 - DIRECT
 - PERIPHERAL
 - INDIRECT
-- DISTRACTION
+- DISTRACTION"""
+        if keywords is None:
+            # First batch for this goal: the keywords come back in the same request as the verdicts
+            prompt = f"""Generate a comprehensive list of relevant keywords for the following study goal and description,
+then analyze the relevance of each of the following window titles to it.
+Study Goal: {goal}
+Description: {description}
+
+Windows (numbered from 0, with their domain/URL in brackets):
+{windows}
 
-Return only the category name, with no extra text or characters.
+{categories}
+
+Return only a JSON object with 20 to 50 keywords and one object per window, e.g. {{"keywords": ["..."], "windows": [{{"i": 0, "c": "DIRECT"}}, {{"i": 1, "c": "DISTRACTION"}}]}}
 """
-        data = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "stream": False,
-            "options": {"temperature": 0.2, "num_predict": 200}
-        }
-        
-        try:
-            response = requests.post(self.local_llm_url, json=data)
-            response.raise_for_status()
-            classification = response.json()['response'].strip().upper()
+            num_predict, until, answer_re = 20 * len(misses) + 550, _JSON_OBJ_END_RE, _JSON_OBJ_RE
+        else:
+            prompt = f"""Analyze the relevance of each of the following window titles to the study goal and description.
+Study Goal: {goal}
+Description: {description}
+Relevant Keywords: {', '.join(keywords)}
 
-            # Now, check if the classification is a valid key
-            valid_classifications = {'DIRECT', 'PERIPHERAL', 'INDIRECT', 'DISTRACTION'}
-            if classification not in valid_classifications:
-                print(f"{Colors.FAIL}LLM returned an invalid classification: '{classification}'. Falling back to rule-based.{Colors.ENDC}")
-                return self._rule_based_classify(title, goal, description, domain, keywords)
+Windows (numbered from 0, with their domain/URL in brackets):
+{windows}
 
-            # We can't get a score from a direct classification, so we'll use a fixed value or a simple rule
-            score = self._score_from_classification(classification)
+{categories}
 
-            self.classification_cache[cache_key] = (score, classification)
-            return score, classification
+Return only a JSON array with one object per window, e.g. [{{"i": 0, "c": "DIRECT"}}, {{"i": 1, "c": "DISTRACTION"}}]
+"""
+            num_predict, until, answer_re = 20 * len(misses) + 50, _JSON_ARR_RE, _JSON_ARR_RE
         
+        try:
+            content = self._ollama_generate(prompt, num_predict, until=until)
+            match = answer_re.search(content)
+            if not match:
+                raise ValueError("No valid JSON in LLM response")
+            parsed = _json_loads(match.group(0))
+            if keywords is None:
+                keywords = self._store_keywords(parsed.get('keywords') or [], goal, description)
+                parsed = parsed.get('windows') or []
+            answers = {int(answer['i']): str(answer['c']).strip().upper() for answer in parsed}
         except Exception as e:
-            print(f"{Colors.FAIL}LLM classification failed: {e}. Falling back to rule-based.{Colors.ENDC}")
-            return self._rule_based_classify(title, goal, description, domain, keywords)
+            print(f"{Colors.FAIL}LLM batch classification failed: {e}. Falling back to rule-based.{Colors.ENDC}")
+            answers = {}
+        if keywords is None:
+            keywords = _goal_words(goal, description)
+        
+        for n, i in enumerate(misses):
+            title, domain, process = items[i]
+            classification = answers.get(n)
+            if classification in CLASSIFICATIONS:
+                results[i] = (self._score_from_classification(classification), classification)
+                self._cache_put(self.classification_cache, cache_keys[i], results[i])
+                self._remember_source(process, domain, goal, description, results[i])
+            else:
+                results[i] = self._rule_based_classify(title, goal, description, domain, keywords)
+        return results
 
 
     def _score_from_classification(self, classification: str) -> float:
         """Maps a classification string to a numerical score."""
-        scores = {
-            'DIRECT': 0.9,
-            'PERIPHERAL': 0.7,
-            'INDIRECT': 0.4,
-            'DISTRACTION': 0.1
-        }
-        return scores.get(classification, 0.0)
+        return _CLASS_SCORE.get(classification, 0.0)
     
     def _rule_based_classify(self, title: str, goal: str, description: str, domain: str, keywords: List[str]) -> Tuple[float, str]:
-        """Classifies content relevance using rule-based keyword matching as a fallback."""
+        """Classifies content relevance using rule-based matching of lowercased keywords."""
         title_lower = title.lower()
         
-        final_score = 0.5
-        
-        for keyword in keywords:
-            if keyword.lower() in title_lower:
-                final_score += 0.1
+        final_score = 0.5 + 0.1 * sum(keyword in title_lower for keyword in keywords)
         
-        project_terms = ['focusflow', 'daip', 'v3.py', 'activity_tracker']
-        if any(term in title_lower for term in project_terms):
+        if any(term in title_lower for term in _PROJECT_TERMS):
             final_score += 0.3
 
-        distraction_domains = {'facebook.com', 'twitter.com', 'instagram.com', 'tiktok.com', 'reddit.com', 'netflix.com', 'twitch.tv'}
-        if domain in distraction_domains:
+        if domain in _DISTRACTION_DOMAINS:
             final_score = max(0.05, final_score - 0.4)
             
         final_score = min(final_score, 1.0)
@@ -248,27 +447,41 @@ Return only the category name, with no extra text or characters.
         
         return final_score, classification
     
-    def calculate_relevance_score(self, title: str, goal: str, description: str, domain: str) -> Tuple[float, str]:
-        """Determines relevance using LLM first, falling back to rules if necessary."""
-        is_ollama_up = self._check_ollama_status()
-        
-        if is_ollama_up:
-            return self._llm_classify(title, goal, description, domain)
-        
-        else:
-            print(f"{Colors.WARNING}Ollama server offline. Using keyword-based fallback.{Colors.ENDC}")
-            keywords = re.findall(r'\w+', goal.lower() + ' ' + description.lower())
-            return self._rule_based_classify(title, goal, description, domain, keywords)
+    def rule_based_score(self, title: str, goal: str, description: str, domain: str) -> Tuple[float, str]:
+        """Scores with the goal's own words; no LLM round trip."""
+        return self._rule_based_classify(title, goal, description, domain, _goal_words(goal, description))
 
 class FocusDatabase:
     """Manages local storage of sessions and activities in an SQLite database."""
+    SESSION_INSERT = '''
+        INSERT INTO sessions (goal, description, start_time, end_time, total_duration)
+        VALUES (?, ?, ?, ?, ?)
+    '''
+    ACTIVITY_INSERT = '''
+        INSERT INTO activities 
+        (session_id, timestamp, title, process, url, classification, 
+         relevance_score, duration, tags)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    WRITE_BATCH = 64
+    
     def __init__(self, db_path: str = "focus_tracker.db"):
         self.db_path = db_path
+        # Only the writer thread touches the connection after init_database; callers
+        # enqueue saves so ending a session never waits on disk
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
         self.init_database()
+        self._write_q = queue.SimpleQueue()
+        self._writer = threading.Thread(target=self._writer_loop, name="focus-db-writer", daemon=True)
+        self._writer.start()
     
     def init_database(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.conn.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.execute('PRAGMA mmap_size=268435456')
+        cursor.execute('PRAGMA cache_size=-20000')
         
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS sessions (
@@ -299,39 +512,21 @@ class FocusDatabase:
             )
         ''')
         
-        conn.commit()
-        conn.close()
-    
-    def save_session(self, session: FocusSession) -> int:
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_activities_session ON activities (session_id)')
         
-        cursor.execute('''
-            INSERT INTO sessions (goal, description, start_time, end_time, total_duration)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (
+    @staticmethod
+    def session_row(session: FocusSession) -> tuple:
+        return (
             session.goal,
             session.description,
             session.start_time,
             session.end_time,
             int(session.duration.total_seconds()) if session.end_time else None
-        ))
-        
-        session_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-        return session_id
+        )
     
-    def save_activity(self, session_id: int, activity: Activity):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO activities 
-            (session_id, timestamp, title, process, url, classification, 
-             relevance_score, duration, tags)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
+    @staticmethod
+    def activity_row(session_id: int, activity: Activity) -> tuple:
+        return (
             session_id,
             activity.timestamp,
             activity.title,
@@ -339,34 +534,130 @@ class FocusDatabase:
             activity.url,
             activity.classification,
             activity.relevance_score,
-            int(activity.duration.total_seconds()) if activity.duration else None,
+            int(activity.duration) if activity.duration else None,
             ','.join(activity.tags) if activity.tags else None
-        ))
-        
-        conn.commit()
-        conn.close()
+        )
+    
+    def save_session(self, session: FocusSession):
+        """Queues a finished session and all of its activities for writing."""
+        self._write_q.put(session)
+    
+    def close(self):
+        """Writes everything still queued, then closes the connection."""
+        if self._writer.is_alive():
+            self._write_q.put(None)
+            self._writer.join()
+        self.conn.close()
+    
+    def _writer_loop(self):
+        # Drains up to WRITE_BATCH queued saves into each transaction; None means stop
+        while True:
+            jobs = [self._write_q.get()]
+            while jobs[-1] is not None and len(jobs) < self.WRITE_BATCH:
+                try:
+                    jobs.append(self._write_q.get_nowait())
+                except queue.Empty:
+                    break
+            
+            stopping = jobs[-1] is None
+            if stopping:
+                jobs.pop()
+            if jobs:
+                try:
+                    self._write(jobs)
+                except sqlite3.Error as e:
+                    print(f"{Colors.FAIL}Database write failed: {e}{Colors.ENDC}")
+            if stopping:
+                return
+    
+    def _write(self, jobs: List[FocusSession]):
+        # Autocommit connection, so the transaction is opened explicitly
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN')
+        try:
+            for session in jobs:
+                cursor.execute(self.SESSION_INSERT, self.session_row(session))
+                session_id = cursor.lastrowid
+                cursor.executemany(self.ACTIVITY_INSERT,
+                                   [self.activity_row(session_id, activity) for activity in session.activities])
+        except Exception:
+            cursor.execute('ROLLBACK')
+            raise
+        cursor.execute('COMMIT')
 
 class EnhancedWindowMonitor:
     """Monitors and processes active window changes for focus analysis."""
+    LLM_BATCH_SIZE = 8
+    LLM_BATCH_INTERVAL = 10.0
+    __slots__ = (
+        'content_analyzer', 'database', 'current_session', 'current_activity', 'last_window_key',
+        'activity_start_time', 'stop_event', '_session_wall', '_session_mono', 'session_stats',
+        'recent_activities', '_recent_classifications', '_recent_scores', '_recent_durations_s',
+        '_recent_total_s', '_recent_direct_s', '_recent_distractions', 'context_switches',
+        'last_classification', '_pending_llm', '_pending_since', '_pending_lock', '_stats_lock',
+        '_inflight', '_executor', '_xdisp', '_xroot', '_atom_active', '_atom_name', '_atom_pid',
+        '_atom_utf8', '_ws',
+    )
+    
     def __init__(self, content_analyzer: ContentAnalyzer, database: FocusDatabase):
         self.content_analyzer = content_analyzer
         self.database = database
         self.current_session: Optional[FocusSession] = None
         self.current_activity: Optional[Activity] = None
-        self.last_window_info = None
-        self.activity_start_time = None
-        self.running = True
-        
+        # (title, process) of the last polled window; pid alone changing is not a switch
+        self.last_window_key = None
+        self.activity_start_time = None  # _now() value
+        # Set to stop the poll loop; it waits on this between polls, so it stops at once
+        self.stop_event = threading.Event()
+        # Wall-clock/monotonic pair taken at session start to derive activity timestamps
+        self._session_wall = None
+        self._session_mono = 0.0
+        
+        # Seconds per classification
         self.session_stats = {
-            'DIRECT': timedelta(),
-            'PERIPHERAL': timedelta(),
-            'INDIRECT': timedelta(),
-            'DISTRACTION': timedelta()
+            'DIRECT': 0.0,
+            'PERIPHERAL': 0.0,
+            'INDIRECT': 0.0,
+            'DISTRACTION': 0.0
         }
         
         self.recent_activities = deque(maxlen=50)
+        # Column copies of recent_activities, index-aligned, so alerts and the focus
+        # line read plain values instead of walking Activity objects
+        self._recent_classifications = deque(maxlen=50)
+        self._recent_scores = deque(maxlen=50)
+        self._recent_durations_s = deque(maxlen=50)
+        # Running totals over the window above, kept in step on append and eviction
+        self._recent_total_s = 0.0
+        self._recent_direct_s = 0.0
+        # DISTRACTION entries among the newest five, for the focus alert
+        self._recent_distractions = 0
         self.context_switches = 0
         self.last_classification = None
+        
+        # Activities get a rule-based score immediately and are re-scored by
+        # the LLM in batches of up to LLM_BATCH_SIZE on a small worker pool
+        self._pending_llm = []
+        self._pending_since = None
+        self._pending_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._inflight = set()
+        self._executor = futures.ThreadPoolExecutor(max_workers=2, thread_name_prefix="ollama")
+        
+        # One persistent X connection instead of forking xdotool three times per poll
+        self._xdisp = None
+        if sys.platform.startswith('linux') and XLIB_AVAILABLE:
+            try:
+                self._xdisp = Display()
+                self._xroot = self._xdisp.screen().root
+                self._atom_active = self._xdisp.intern_atom('_NET_ACTIVE_WINDOW')
+                self._atom_name = self._xdisp.intern_atom('_NET_WM_NAME')
+                self._atom_pid = self._xdisp.intern_atom('_NET_WM_PID')
+                self._atom_utf8 = self._xdisp.intern_atom('UTF8_STRING')
+            except Exception:
+                self._xdisp = None
+        # In-process frontmost-app queries on macOS instead of spawning osascript
+        self._ws = NSWorkspace.sharedWorkspace() if sys.platform == 'darwin' and PYOBJC_AVAILABLE else None
     
     def start_session(self, goal: str, description: str):
         if self.current_session:
@@ -377,35 +668,50 @@ class EnhancedWindowMonitor:
             description=description,
             start_time=datetime.now()
         )
+        self._session_wall = self.current_session.start_time
+        self._session_mono = _now()
         
-        self.session_stats = {k: timedelta() for k in self.session_stats}
+        self.session_stats = dict.fromkeys(self.session_stats, 0.0)
         self.context_switches = 0
-        self.recent_activities.clear()
+        with self._stats_lock:
+            self.recent_activities.clear()
+            self._recent_classifications.clear()
+            self._recent_scores.clear()
+            self._recent_durations_s.clear()
+            self._recent_total_s = 0.0
+            self._recent_direct_s = 0.0
+            self._recent_distractions = 0
         
         print(f"\n{Colors.HEADER}🎯 FOCUS SESSION STARTED{Colors.ENDC}")
         print(f"Goal: {Colors.BOLD}{goal}{Colors.ENDC}")
         print(f"Description: {description}")
         print(f"Started: {self.current_session.start_time.strftime('%H:%M:%S')}")
-        print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
+        print(_RULE)
     
     def end_session(self):
         if not self.current_session:
             return
         
-        if self.current_activity and self.activity_start_time:
-            duration = datetime.now() - self.activity_start_time
-            self.current_activity.duration = duration
-            self.session_stats[self.current_activity.classification] += duration
+        if self.current_activity and self.activity_start_time is not None:
+            duration = _now() - self.activity_start_time
+            with self._stats_lock:
+                self.current_activity.duration = duration
+                self.session_stats[self.current_activity.classification] += duration
+            self.current_session.activities.append(self.current_activity)
         
+        self.flush_llm(wait=True)
         self.current_session.end_time = datetime.now()
         
-        session_id = self.database.save_session(self.current_session)
-        for activity in self.current_session.activities:
-            self.database.save_activity(session_id, activity)
+        self.database.save_session(self.current_session)
         
         self.display_session_summary()
         
+        # The next session starts timing from its own first window
         self.current_session = None
+        self.current_activity = None
+        self.activity_start_time = None
+        self.last_classification = None
+        self.last_window_key = None
     
     def get_active_window(self):
         """Cross-platform active window retrieval."""
@@ -421,6 +727,31 @@ class EnhancedWindowMonitor:
             return None
     
     def _get_active_window_linux(self):
+        if self._xdisp is None:
+            return self._get_active_window_xdotool()
+        
+        try:
+            prop = self._xroot.get_full_property(self._atom_active, X.AnyPropertyType)
+            if not prop or not prop.value or not prop.value[0]:
+                return None
+            window = self._xdisp.create_resource_object('window', prop.value[0])
+            
+            name_prop = window.get_full_property(self._atom_name, self._atom_utf8)
+            if name_prop:
+                window_name = name_prop.value.decode('utf-8', 'replace')
+            else:
+                window_name = window.get_wm_name() or "Unknown"
+            
+            pid_prop = window.get_full_property(self._atom_pid, X.AnyPropertyType)
+            if pid_prop and pid_prop.value:
+                pid = int(pid_prop.value[0])
+                process = _psutil().Process(pid)
+                return {'title': window_name, 'process': process.name(), 'pid': pid}
+        except Exception:
+            pass
+        return None
+    
+    def _get_active_window_xdotool(self):
         try:
             result = subprocess.run(['xdotool', 'getactivewindow'], capture_output=True, text=True)
             if result.returncode == 0:
@@ -430,13 +761,39 @@ class EnhancedWindowMonitor:
                 result = subprocess.run(['xdotool', 'getwindowpid', window_id], capture_output=True, text=True)
                 if result.returncode == 0:
                     pid = int(result.stdout.strip())
-                    process = psutil.Process(pid)
+                    process = _psutil().Process(pid)
                     return {'title': window_name, 'process': process.name(), 'pid': pid}
         except Exception:
             pass
         return None
     
     def _get_active_window_mac(self):
+        if self._ws is None:
+            return self._get_active_window_osascript()
+        
+        try:
+            app = self._ws.frontmostApplication()
+            if app is None:
+                return None
+            app_name = app.localizedName()
+            pid = app.processIdentifier()
+            
+            # Window list is ordered front to back; take the app's first normal-layer window
+            window_title = None
+            windows = CGWindowListCopyWindowInfo(
+                kCGWindowListOptionOnScreenOnly | kCGWindowListExcludeDesktopElements, kCGNullWindowID
+            )
+            for window in windows or ():
+                if window.get('kCGWindowOwnerPID') == pid and window.get('kCGWindowLayer') == 0:
+                    window_title = window.get('kCGWindowName')
+                    break
+            
+            return {'title': window_title or app_name, 'process': app_name, 'pid': pid}
+        except Exception:
+            pass
+        return None
+    
+    def _get_active_window_osascript(self):
         try:
             script = '''
             tell application "System Events"
@@ -465,7 +822,7 @@ class EnhancedWindowMonitor:
             hwnd = win32gui.GetForegroundWindow()
             window_title = win32gui.GetWindowText(hwnd)
             _, pid = win32process.GetWindowThreadProcessId(hwnd)
-            process = psutil.Process(pid)
+            process = _psutil().Process(pid)
             return {'title': window_title, 'process': process.name(), 'pid': pid}
         except Exception:
             pass
@@ -475,25 +832,38 @@ class EnhancedWindowMonitor:
         if not self.current_session:
             return
         
-        now = datetime.now()
+        # Back on the window we're already timing: keep the running activity, no re-scoring
+        if (self.current_activity and self.current_activity.title == window_info['title'] and
+                self.current_activity.process == window_info['process']):
+            return
+        
+        now = _now()
         
-        if self.current_activity and self.activity_start_time:
+        if self.current_activity and self.activity_start_time is not None:
             duration = now - self.activity_start_time
-            self.current_activity.duration = duration
-            self.session_stats[self.current_activity.classification] += duration
+            with self._stats_lock:
+                self.current_activity.duration = duration
+                self.session_stats[self.current_activity.classification] += duration
+                self._remember(self.current_activity)
             self.current_session.activities.append(self.current_activity)
-            self.recent_activities.append(self.current_activity)
         
         domain = self.content_analyzer.extract_domain(window_info['title'], window_info['process'])
-        relevance_score, classification = self.content_analyzer.calculate_relevance_score(
-            window_info['title'], 
-            self.current_session.goal,
-            self.current_session.description,
-            domain
+        # Same app and domain judged by the LLM within the last minute: reuse that, skip the queue
+        recent = self.content_analyzer.recent_source_result(
+            window_info['process'], domain, self.current_session.goal, self.current_session.description
         )
+        if recent is not None:
+            relevance_score, classification = recent
+        else:
+            relevance_score, classification = self.content_analyzer.rule_based_score(
+                window_info['title'], 
+                self.current_session.goal,
+                self.current_session.description,
+                domain
+            )
         
         self.current_activity = Activity(
-            timestamp=now,
+            timestamp=self._wall_time(now),
             title=window_info['title'],
             process=window_info['process'],
             url=domain,
@@ -503,6 +873,8 @@ class EnhancedWindowMonitor:
         )
         
         self.activity_start_time = now
+        if recent is None:
+            self.queue_llm(self.current_activity)
         
         if self.last_classification and self.last_classification != classification:
             self.context_switches += 1
@@ -511,6 +883,99 @@ class EnhancedWindowMonitor:
         self.display_current_activity()
         self.check_focus_alerts()
     
+    def _wall_time(self, mono: float) -> datetime:
+        """Converts a _now() reading taken during this session to a datetime."""
+        return self._session_wall + timedelta(seconds=mono - self._session_mono)
+    
+    def queue_llm(self, activity: Activity):
+        """Queues an activity for LLM re-scoring, flushing once the batch is full."""
+        with self._pending_lock:
+            if not self._pending_llm:
+                self._pending_since = _now()
+            self._pending_llm.append(activity)
+            full = len(self._pending_llm) >= self.LLM_BATCH_SIZE
+        if full:
+            self.flush_llm()
+    
+    def flush_llm(self, wait: bool = False):
+        """Hands every queued activity to the worker pool as one LLM batch."""
+        with self._pending_lock:
+            pending, self._pending_llm = self._pending_llm, []
+        session = self.current_session
+        if pending and session:
+            # The Ollama round trip runs on the pool so window polling keeps going
+            future = self._executor.submit(self._classify_pending, pending, session.goal, session.description)
+            with self._pending_lock:
+                self._inflight.add(future)
+            future.add_done_callback(self._inflight.discard)
+        if wait:
+            with self._pending_lock:
+                inflight = list(self._inflight)
+            futures.wait(inflight)
+    
+    def _classify_pending(self, pending: List[Activity], goal: str, description: str):
+        try:
+            if not self.content_analyzer._check_ollama_status():
+                return
+            results = self.content_analyzer._llm_classify_batch(
+                [(activity.title, activity.url, activity.process) for activity in pending],
+                goal,
+                description
+            )
+            for activity, result in zip(pending, results):
+                self._apply_classification(activity, result)
+        except Exception as e:
+            print(f"{Colors.FAIL}LLM classification worker error: {e}{Colors.ENDC}")
+    
+    def _apply_classification(self, activity: Activity, result: Tuple[float, str]):
+        score, classification = result
+        with self._stats_lock:
+            previous = activity.classification
+            activity.relevance_score = score
+            activity.classification = classification
+            # Already finished: move its time to the new bucket
+            if activity.duration and previous != classification:
+                self.session_stats[previous] -= activity.duration
+                self.session_stats[classification] += activity.duration
+            for i, recent in enumerate(self.recent_activities):
+                if recent is activity:
+                    self._recent_classifications[i] = classification
+                    self._recent_scores[i] = score
+                    if (previous == 'DIRECT') != (classification == 'DIRECT'):
+                        seconds = self._recent_durations_s[i]
+                        self._recent_direct_s += seconds if classification == 'DIRECT' else -seconds
+                    if (i >= len(self._recent_classifications) - 5 and
+                            (previous == 'DISTRACTION') != (classification == 'DISTRACTION')):
+                        self._recent_distractions += 1 if classification == 'DISTRACTION' else -1
+                    break
+        if previous == classification:
+            return
+        if activity is self.current_activity:
+            self.last_classification = classification
+        title = activity.title[:50] + "..." if len(activity.title) > 50 else activity.title
+        print(f"{Colors.OKCYAN}🤖 LLM reclassified \"{title}\": {previous} → {classification} ({score:.2f}){Colors.ENDC}")
+    
+    def _remember(self, activity: Activity):
+        # Caller holds _stats_lock; all four deques share maxlen so they evict together
+        if len(self._recent_durations_s) == self._recent_durations_s.maxlen:
+            evicted = self._recent_durations_s[0]
+            self._recent_total_s -= evicted
+            if self._recent_classifications[0] == 'DIRECT':
+                self._recent_direct_s -= evicted
+        # The fifth-newest entry drops out of the alert window
+        if len(self._recent_classifications) >= 5 and self._recent_classifications[-5] == 'DISTRACTION':
+            self._recent_distractions -= 1
+        seconds = activity.duration
+        self.recent_activities.append(activity)
+        self._recent_classifications.append(activity.classification)
+        self._recent_scores.append(activity.relevance_score)
+        self._recent_durations_s.append(seconds)
+        self._recent_total_s += seconds
+        if activity.classification == 'DIRECT':
+            self._recent_direct_s += seconds
+        elif activity.classification == 'DISTRACTION':
+            self._recent_distractions += 1
+    
     def display_current_activity(self):
         if not self.current_activity:
             return
@@ -520,74 +985,62 @@ class EnhancedWindowMonitor:
         score = self.current_activity.relevance_score
         title = self.current_activity.title[:60] + "..." if len(self.current_activity.title) > 60 else self.current_activity.title
         
-        color = {
-            'DIRECT': Colors.DIRECT,
-            'PERIPHERAL': Colors.WARNING,
-            'INDIRECT': Colors.OKBLUE,
-            'DISTRACTION': Colors.FAIL
-        }.get(classification, Colors.ENDC)
-        
-        emoji = {
-            'DIRECT': '🟢',
-            'PERIPHERAL': '🟡',
-            'INDIRECT': '🟠',
-            'DISTRACTION': '🔴'
-        }.get(classification, '⚪')
-        
-        print(f"\n{color}[{timestamp}] {emoji} {classification} ({score:.2f}){Colors.ENDC}")
-        print(f"🌐 {self.current_activity.process}: \"{title}\"")
-        
-        if len(self.recent_activities) > 0:
-            total_time = sum((a.duration for a in self.recent_activities if a.duration), timedelta())
-            if total_time.total_seconds() > 0:
-                focus_time = sum((a.duration for a in self.recent_activities 
-                                if a.classification == 'DIRECT' and a.duration), timedelta())
-                focus_percentage = (focus_time.total_seconds() / total_time.total_seconds()) * 100
-                print(f"📊 Session Focus: {focus_percentage:.1f}% | Switches: {self.context_switches}")
+        color = _CLASS_COLOR.get(classification, _ENDC)
+        emoji = _CLASS_EMOJI.get(classification, '⚪')
+        
+        text = (f"\n{color}[{timestamp}] {emoji} {classification} ({score:.2f}){_ENDC}\n"
+                f"🌐 {self.current_activity.process}: \"{title}\"\n")
+        
+        total_time = self._recent_total_s
+        focus_time = self._recent_direct_s
+        if total_time > 0:
+            focus_percentage = (focus_time / total_time) * 100
+            text += f"📊 Session Focus: {focus_percentage:.1f}% | Switches: {self.context_switches}\n"
+        _write(text)
     
     def check_focus_alerts(self):
-        if not self.current_activity or len(self.recent_activities) < 5:
+        if not self.current_activity or len(self._recent_classifications) < 5:
             return
         
-        recent_classifications = [a.classification for a in list(self.recent_activities)[-5:]]
-        if recent_classifications.count('DISTRACTION') >= 3:
-            print(f"{Colors.FAIL}⚠️  FOCUS ALERT: Multiple distractions detected{Colors.ENDC}")
+        with self._stats_lock:
+            distractions = self._recent_distractions
+            recent_scores = list(islice(reversed(self._recent_scores), 7))
+        if distractions >= 3:
+            print(_MSG_DISTRACTION_ALERT)
         
-        recent_scores = [a.relevance_score for a in list(self.recent_activities)[-7:]]
         if len(recent_scores) >= 7 and sum(recent_scores) / len(recent_scores) < 0.5:
-            print(f"{Colors.WARNING}🤔 DRIFT DETECTED: Low relevance to goal \"{self.current_session.goal}\"{Colors.ENDC}")
+            print(f"{_WARNING}🤔 DRIFT DETECTED: Low relevance to goal \"{self.current_session.goal}\"{_ENDC}")
         
         if self.context_switches > 0 and self.context_switches % 15 == 0:
-            print(f"{Colors.WARNING}🔄 HIGH SWITCHING: {self.context_switches} context switches{Colors.ENDC}")
+            print(f"{_WARNING}🔄 HIGH SWITCHING: {self.context_switches} context switches{_ENDC}")
     
     def display_session_summary(self):
         if not self.current_session:
             return
         
-        total_duration = self.current_session.duration
+        total_seconds = self.current_session.duration.total_seconds()
         
         print(f"\n{Colors.HEADER}🧠 FOCUS SESSION SUMMARY{Colors.ENDC}")
-        print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
+        print(_RULE)
         print(f"🎯 Goal: {self.current_session.goal}")
         print(f"📝 Description: {self.current_session.description}")
-        print(f"⏱️  Duration: {self.format_duration(total_duration)}")
+        print(f"⏱️  Duration: {self.format_duration(total_seconds)}")
         print(f"🔄 Context Switches: {self.context_switches}")
         
         print(f"\n📊 RELEVANCE BREAKDOWN:")
-        print("┌─────────────────────────────────────────────┐")
+        print(_BOX_TOP)
         
         for classification, duration in self.session_stats.items():
-            if total_duration.total_seconds() > 0:
-                percentage = (duration.total_seconds() / total_duration.total_seconds()) * 100
-                emoji = {'DIRECT': '🟢', 'PERIPHERAL': '🟡', 'INDIRECT': '🟠', 'DISTRACTION': '🔴'}[classification]
+            if total_seconds > 0:
+                percentage = (duration / total_seconds) * 100
+                emoji = _CLASS_EMOJI[classification]
                 print(f"│ {emoji} {classification:12}: {self.format_duration(duration):>8} | {percentage:>5.1f}% │")
         
-        print("└─────────────────────────────────────────────┘")
+        print(_BOX_BOTTOM)
         
-        if total_duration.total_seconds() > 0:
-            direct_time = self.session_stats['DIRECT'].total_seconds()
-            peripheral_time = self.session_stats['PERIPHERAL'].total_seconds()
-            total_seconds = total_duration.total_seconds()
+        if total_seconds > 0:
+            direct_time = self.session_stats['DIRECT']
+            peripheral_time = self.session_stats['PERIPHERAL']
             
             focus_score = ((direct_time * 1.0) + (peripheral_time * 0.7)) / total_seconds * 10
             focus_score = min(focus_score, 10.0)
@@ -603,8 +1056,8 @@ class EnhancedWindowMonitor:
             else:
                 print(f"{Colors.FAIL}❌ LOW focus - consider strategies to reduce distractions{Colors.ENDC}")
     
-    def format_duration(self, duration: timedelta) -> str:
-        total_seconds = int(duration.total_seconds())
+    def format_duration(self, seconds: float) -> str:
+        total_seconds = int(seconds)
         hours = total_seconds // 3600
         minutes = (total_seconds % 3600) // 60
         seconds = total_seconds % 60
@@ -616,28 +1069,44 @@ class EnhancedWindowMonitor:
     
     def start_monitoring(self):
         print(f"{Colors.HEADER}🪟 Enhanced Focus Monitor Started{Colors.ENDC}")
-        while self.running:
+        while not self.stop_event.is_set():
             try:
                 window_info = self.get_active_window()
-                if window_info and window_info != self.last_window_info:
-                    self.last_window_info = window_info
-                    self.process_window_change(window_info)
-                time.sleep(2)
+                if window_info:
+                    window_key = (window_info['title'], window_info['process'])
+                    if window_key != self.last_window_key:
+                        self.last_window_key = window_key
+                        self.process_window_change(window_info)
+                if self._pending_llm and _now() - self._pending_since >= self.LLM_BATCH_INTERVAL:
+                    self.flush_llm()
+                self.stop_event.wait(2)
             except KeyboardInterrupt:
                 if self.current_session:
                     self.end_session()
                 break
             except Exception as e:
                 print(f"{Colors.FAIL}Window monitoring error: {e}{Colors.ENDC}")
-                time.sleep(5)
+                self.stop_event.wait(5)
 
 class EnhancedActivityTracker:
     """Main class to manage the interactive focus tracker application."""
+    __slots__ = ('database', 'content_analyzer', 'window_monitor', 'running', '_dispatch')
+    
     def __init__(self):
         self.database = FocusDatabase()
         self.content_analyzer = ContentAnalyzer(model_name='mistral')
+        self.content_analyzer.load_cache(LLM_CACHE_PATH)
         self.window_monitor = EnhancedWindowMonitor(self.content_analyzer, self.database)
         self.running = True
+        self._dispatch = {
+            'start': self.interactive_session_start,
+            'stop': self._cmd_stop,
+            'status': self._cmd_status,
+            'stats': self._cmd_stats,
+            'help': self.show_commands,
+            'quit': self._cmd_quit,
+            'exit': self._cmd_quit,
+        }
     
     def interactive_session_start(self):
         print(f"\n{Colors.BOLD}🎯 Focus Session Setup{Colors.ENDC}")
@@ -660,98 +1129,79 @@ class EnhancedActivityTracker:
         return goal, description
     
     def show_commands(self):
-        print(f"\n{Colors.HEADER}📋 Available Commands:{Colors.ENDC}")
-        print(f"  {Colors.OKCYAN}start{Colors.ENDC}  - Start a new focus session")
-        print(f"  {Colors.OKCYAN}stop{Colors.ENDC}   - End current session")
-        print(f"  {Colors.OKCYAN}status{Colors.ENDC} - Show current session status")
-        print(f"  {Colors.OKCYAN}stats{Colors.ENDC}  - Show session statistics")
-        print(f"  {Colors.OKCYAN}help{Colors.ENDC}   - Show this help")
-        print(f"  {Colors.OKCYAN}quit{Colors.ENDC}   - Exit the tracker")
+        _write(_MSG_COMMANDS)
+    
+    def close(self):
+        """Persists the LLM caches and waits for queued database writes."""
+        self.content_analyzer.save_cache(LLM_CACHE_PATH)
+        self.database.close()
     
     def run_interactive(self):
-        print(f"{Colors.BOLD}🚀 Enhanced Focus Tracker{Colors.ENDC}")
-        print(f"{Colors.HEADER}{'='*50}{Colors.ENDC}")
-        
-        print(f"{Colors.WARNING}Ensure Ollama is running and a model (e.g., mistral) is pulled.{Colors.ENDC}")
-        print(f"{Colors.OKCYAN}Run 'ollama list' to check available models.{Colors.ENDC}")
-
+        print(_MSG_BANNER)
         self.show_commands()
         
         monitor_thread = threading.Thread(target=self.window_monitor.start_monitoring, daemon=True)
         monitor_thread.start()
         
-        while self.running:
-            try:
-                command = input(f"\n{Colors.BOLD}>{Colors.ENDC} ").strip().lower()
-                
-                if command == 'start':
-                    self.interactive_session_start()
-                
-                elif command == 'stop':
-                    if self.window_monitor.current_session:
-                        self.window_monitor.end_session()
-                        print(f"{Colors.OKGREEN}✅ Session ended{Colors.ENDC}")
-                    else:
-                        print(f"{Colors.WARNING}No active session to end{Colors.ENDC}")
-                
-                elif command == 'status':
-                    if self.window_monitor.current_session:
-                        session = self.window_monitor.current_session
-                        duration = session.duration
-                        print(f"\n🎯 Active Session: {session.goal}")
-                        print(f"📝 Description: {session.description}")
-                        print(f"⏱️  Duration: {self.window_monitor.format_duration(duration)}")
-                        print(f"🔄 Context Switches: {self.window_monitor.context_switches}")
-                    else:
-                        print(f"{Colors.WARNING}No active session{Colors.ENDC}")
-                
-                elif command == 'stats':
-                    if self.window_monitor.current_session:
-                        total = self.window_monitor.current_session.duration
-                        print(f"\n📊 Current Session Stats:")
-                        for classification, duration in self.window_monitor.session_stats.items():
-                            if total.total_seconds() > 0:
-                                pct = (duration.total_seconds() / total.total_seconds()) * 100
-                                emoji = {'DIRECT': '🟢', 'PERIPHERAL': '🟡', 'INDIRECT': '🟠', 'DISTRACTION': '🔴'}[classification]
-                                print(f"  {emoji} {classification}: {self.window_monitor.format_duration(duration)} ({pct:.1f}%)")
-                
-                elif command == 'help':
-                    self.show_commands()
-                
-                elif command in ['quit', 'exit']:
-                    if self.window_monitor.current_session:
-                        self.window_monitor.end_session()
-                    self.running = False
-                    self.window_monitor.running = False
-                    print(f"{Colors.OKGREEN}👋 Goodbye!{Colors.ENDC}")
+        try:
+            while self.running:
+                command = input(_MSG_PROMPT).strip().lower()
                 
+                handler = self._dispatch.get(command)
+                if handler is not None:
+                    handler()
                 else:
-                    print(f"{Colors.WARNING}Unknown command. Type 'help' for available commands.{Colors.ENDC}")
-                    
-            except KeyboardInterrupt:
-                if self.window_monitor.current_session:
-                    self.window_monitor.end_session()
-                self.running = False
-                self.window_monitor.running = False
-                break
-            except EOFError:
-                break
-
-def main():
-    print(f"{Colors.BOLD}Enhanced Focus Tracker - Study Session Monitor{Colors.ENDC}")
-    print(f"{Colors.HEADER}{'='*60}{Colors.ENDC}")
+                    print(_MSG_UNKNOWN)
+        except (KeyboardInterrupt, EOFError):
+            pass
+        finally:
+            self._shutdown()
     
-    missing_deps = []
+    def _shutdown(self):
+        # Every way out of the REPL ends here; a second call finds nothing left to end
+        if self.window_monitor.current_session:
+            self.window_monitor.end_session()
+        self.running = False
+        self.window_monitor.stop_event.set()
     
-    try:
-        import psutil
-    except ImportError:
-        missing_deps.append('psutil')
+    def _cmd_stop(self):
+        if self.window_monitor.current_session:
+            self.window_monitor.end_session()
+            print(f"{Colors.OKGREEN}✅ Session ended{Colors.ENDC}")
+        else:
+            print(f"{Colors.WARNING}No active session to end{Colors.ENDC}")
     
-    try:
-        import requests
-    except ImportError:
-        missing_deps.append('requests')
+    def _cmd_status(self):
+        if self.window_monitor.current_session:
+            session = self.window_monitor.current_session
+            duration = session.duration.total_seconds()
+            _write(f"\n🎯 Active Session: {session.goal}\n"
+                   f"📝 Description: {session.description}\n"
+                   f"⏱️  Duration: {self.window_monitor.format_duration(duration)}\n"
+                   f"🔄 Context Switches: {self.window_monitor.context_switches}\n")
+        else:
+            print(f"{Colors.WARNING}No active session{Colors.ENDC}")
+    
+    def _cmd_stats(self):
+        if self.window_monitor.current_session:
+            total = self.window_monitor.current_session.duration.total_seconds()
+            lines = ["\n📊 Current Session Stats:"]
+            for classification, duration in self.window_monitor.session_stats.items():
+                if total > 0:
+                    pct = (duration / total) * 100
+                    emoji = _CLASS_EMOJI[classification]
+                    lines.append(f"  {emoji} {classification}: {self.window_monitor.format_duration(duration)} ({pct:.1f}%)")
+            _write('\n'.join(lines) + '\n')
+    
+    def _cmd_quit(self):
+        self._shutdown()
+        print(_MSG_GOODBYE)
+
+def main():
+    print(_MSG_HEADER)
+    
+    # Presence check only; the modules are imported where they're used
+    missing_deps = [name for name in ('psutil', 'requests') if importlib.util.find_spec(name) is None]
     
     if missing_deps:
         print(f"{Colors.FAIL}Missing dependencies: {', '.join(missing_deps)}{Colors.ENDC}")
@@ -759,7 +1209,10 @@ def main():
         return
     
     tracker = EnhancedActivityTracker()
-    tracker.run_interactive()
+    try:
+        tracker.run_interactive()
+    finally:
+        tracker.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file